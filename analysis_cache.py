@@ -0,0 +1,69 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from fileutil import atomic_write_json
+
+# Results kept in memory; the disk tier is unbounded
+MEMORY_ENTRIES = 64
+
+
+def recording_hash(path):
+    """SHA-256 of the recording file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(kind, version, content_hash):
+    """Results depend on the recording's content and the analyser that produced them"""
+    return f"{kind}-v{version}-{content_hash}"
+
+
+class AnalysisCache:
+    """Analysis results keyed by cache_key(): a small in-memory LRU over one JSON file per key.
+
+    A new analyser version changes every key, so stale results are never
+    returned; their files are simply no longer read.
+    """
+
+    def __init__(self, directory, memory_entries=MEMORY_ENTRIES):
+        self.directory = directory
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        """The cached (scores, measurements) for ``key``, or None"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        try:
+            with open(self._path(key)) as f:
+                scores, measurements = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._remember(key, (scores, measurements))
+        return scores, measurements
+
+    def put(self, key, result):
+        """Store an analyser's (scores, measurements) under ``key``"""
+        scores, measurements = result
+        atomic_write_json(self._path(key), [scores, measurements], indent=None)
+        self._remember(key, (scores, measurements))
@@ -1,18 +1,24 @@
 import streamlit as st
+import streamlit.components.v1 as components
 import pandas as pd
-import numpy as np
 import tempfile
 import cv2
 import time
 import os
 import json
-import random
-import base64
+import uuid
 from pathlib import Path
 from datetime import date
 import matplotlib.pyplot as plt
 import plotly.express as px
 from streamlit_autorefresh import st_autorefresh
+from patient_store import ConflictError, PatientStore, ShardedPatientStore
+from scoring import combine_predictions, compute_audio_probabilities, compute_video_probabilities
+from audio_engine import AUDIO_FEATURES
+from analysis_cache import AnalysisCache, cache_key, recording_hash
+from job_queue import DONE, FAILED, JobQueue, analyzer_versions
+from model_registry import MODELS
+from video_engine import FEATURE_GUIDELINES, TASK_SECONDS, check_recording_quality
 
 # Page configuration
 st.set_page_config(page_title="NeuroHealth Unified System", layout="wide")
@@ -20,9 +26,20 @@ st.set_page_config(page_title="NeuroHealth Unified System", layout="wide")
 # ------------------------
 # Constants and Configuration
 # ------------------------
-USERS_FILE = "users.json"
+USERS_FILE = "users.json"  # Legacy store, migrated into DB_FILE on first start
+DB_FILE = "neurohealth.db"
 UPLOAD_BASE = "user_data"
 os.makedirs(UPLOAD_BASE, exist_ok=True)
+ANALYSIS_CACHE_DIR = "analysis_cache"  # Results by recording hash and analyser version
+
+# "sqlite" (single DB_FILE) or "sharded" (one JSON file per patient under UPLOAD_BASE)
+STORE_BACKEND = os.environ.get("NEUROHEALTH_STORE", "sqlite")
+
+# Rows per page in the doctor dashboard patient list
+PATIENTS_PER_PAGE = 20
+
+# How often a page waiting on a background analysis reruns to check it
+JOB_POLL_INTERVAL_MS = 500
 
 # Pre-configured doctors (from first code)
 AVAILABLE_DOCTORS = ["Dr. Syam Kumar", "Dr. Devi"]
@@ -64,204 +81,11 @@ REFERRAL_HOSPITALS = {
 # Blood group options
 BLOOD_GROUPS = ["A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-"]
 
-# MODIFIED: Feature descriptions for video analysis (60 seconds - 6 tasks, 10 seconds each)
-FEATURE_GUIDELINES = [
-    ("Facial expressions & blink rate", "Keep your face visible. Blink normally and show a few natural expressions."),
-    ("Resting tremor & postural tremor", "Keep your hands relaxed on your lap. Observe for tremors while resting."),
-    ("Finger tapping (bradykinesia)", "Tap your index finger and thumb together repeatedly for 5 seconds."),
-    ("Arm swing & gait", "Stand and walk a few steps, letting your arms swing naturally."),
-    ("Postural stability", "Stand still, then turn around carefully. Try not to lose balance."),
-    ("Facial symmetry & head tremor", "Smile naturally, relax your face, and keep head still."),
-]
-
-# Audio feature descriptions for display
-AUDIO_FEATURES = [
-    ("Speech rate & fluency", "Analysis of speaking speed and smoothness of speech"),
-    ("Voice quality & stability", "Assessment of voice tremor and pitch variations"),
-    ("Articulation precision", "Clarity of consonants and vowel pronunciation"),
-    ("Pause patterns", "Frequency and duration of speech pauses"),
-    ("Monotonicity", "Variation in pitch and tone during speech"),
-    ("Word finding ability", "Ease of retrieving and expressing words"),
-    ("Semantic coherence", "Logical flow and meaning in speech"),
-    ("Memory recall", "Ability to remember and repeat information"),
-    ("Cognitive processing", "Speed of verbal responses and comprehension"),
-    ("Neurological speech markers", "Signs of motor speech disorders"),
-]
-
-# MODIFIED: Audio recorder HTML component (60 seconds max)
-AUDIO_RECORDER_HTML = r"""
-<div style="font-family: sans-serif; margin:6px;">
-  <div style="display:flex; gap:12px; align-items:center;">
-    <button id="recBtn">🎙 Start Recording</button>
-    <button id="stopBtn" style="display:none; background:#dc3545; color:white;">⏹ Stop Recording</button>
-    <div id="timer" style="font-weight:bold; font-size:16px;">00:00</div>
-    <div id="status" style="margin-left:8px;color:#555;font-size:13px;">Idle</div>
-  </div>
-  <canvas id="wavecanvas" width="600" height="100" style="width:100%; border-radius:6px; background:#fafafa; margin-top:8px; border:1px solid #ddd;"></canvas>
-  <div style="margin-top:6px; font-size:12px; color:#666;">Make sure to allow microphone access when prompted.</div>
-  <div id="taskDisplay" style="margin-top:6px; font-size:14px; font-weight:bold; color:#1f618d;">Task: Waiting to start...</div>
-</div>
-
-<script>
-function nowStr() { return Date.now(); }
-function sendToStreamlit(obj) {
-  try { if (typeof Streamlit !== "undefined" && Streamlit.setComponentValue) { Streamlit.setComponentValue(obj); return; } } catch(e){}
-  try { window.parent.postMessage(obj, "*"); } catch(e){}
-}
+# Video task descriptions (FEATURE_GUIDELINES) live in video_engine
+# Audio feature descriptions (AUDIO_FEATURES) live in audio_engine
 
-let recBtn = document.getElementById("recBtn");
-let stopBtn = document.getElementById("stopBtn");
-let timerEl = document.getElementById("timer");
-let statusEl = document.getElementById("status");
-let canvas = document.getElementById("wavecanvas");
-let taskDisplay = document.getElementById("taskDisplay");
-let ctx = canvas.getContext("2d");
-
-let mediaRecorder = null;
-let gumStream = null;
-let audioCtx = null;
-let analyser = null;
-let dataArray = null;
-let bufferLength = 0;
-let drawId = null;
-let elapsed = 0;
-let timerInterval = null;
-let chunks = [];
-let maxDuration = 60; // MODIFIED: 60 seconds max
-
-// MODIFIED: 4 tasks, 15 seconds each
-const tasks = [
-  "Read aloud: 'The quick brown fox jumps over the lazy dog'",
-  "Count clearly: 'One, two, three ... up to fifteen'",
-  "Say three fruits you like",
-  "Describe what you see around you"
-];
-
-function formatTime(sec) {
-  let m = Math.floor(sec/60);
-  let s = sec % 60;
-  return String(m).padStart(2,'0') + ":" + String(s).padStart(2,'0');
-}
-
-function updateTask(elapsed){
-  if(elapsed < 15) taskDisplay.innerText = "Task: " + tasks[0];
-  else if(elapsed < 30) taskDisplay.innerText = "Task: " + tasks[1];
-  else if(elapsed < 45) taskDisplay.innerText = "Task: " + tasks[2];
-  else taskDisplay.innerText = "Task: " + tasks[3];
-}
-
-function drawWave() {
-  drawId = requestAnimationFrame(drawWave);
-  if (!analyser) return;
-  analyser.getByteTimeDomainData(dataArray);
-  ctx.fillStyle = "#fafafa";
-  ctx.fillRect(0,0,canvas.width,canvas.height);
-  ctx.lineWidth = 2;
-  ctx.strokeStyle = "#2c3e50";
-  ctx.beginPath();
-  let sliceWidth = canvas.width / bufferLength;
-  let x = 0;
-  for (let i = 0; i < bufferLength; i++) {
-    let v = dataArray[i] / 128.0;
-    let y = v * canvas.height/2;
-    if (i === 0) ctx.moveTo(x,y); else ctx.lineTo(x,y);
-    x += sliceWidth;
-  }
-  ctx.lineTo(canvas.width, canvas.height/2);
-  ctx.stroke();
-}
-
-async function startRecording() {
-  try {
-    recBtn.disabled = true;
-    recBtn.style.display = "none";
-    stopBtn.style.display = "inline-block";
-    statusEl.innerText = "Requesting microphone...";
-    elapsed = 0;
-    timerEl.innerText = formatTime(0);
-    chunks = [];
-
-    gumStream = await navigator.mediaDevices.getUserMedia({ audio: true });
-    statusEl.innerText = "Recording... Click Stop to finish";
-
-    audioCtx = new (window.AudioContext || window.webkitAudioContext)();
-    const source = audioCtx.createMediaStreamSource(gumStream);
-    analyser = audioCtx.createAnalyser();
-    analyser.fftSize = 2048;
-    bufferLength = analyser.fftSize;
-    dataArray = new Uint8Array(bufferLength);
-    source.connect(analyser);
-
-    drawWave();
-
-    mediaRecorder = new MediaRecorder(gumStream);
-    mediaRecorder.ondataavailable = function(e) { if (e.data && e.data.size > 0) chunks.push(e.data); };
-    mediaRecorder.onstop = function() {
-      cancelAnimationFrame(drawId);
-      if (audioCtx && audioCtx.state !== "closed") { try { audioCtx.close(); } catch(e){} }
-      statusEl.innerText = "Recording complete!";
-      clearInterval(timerInterval);
-     
-      // Reset buttons
-      recBtn.disabled = false;
-      recBtn.style.display = "inline-block";
-      stopBtn.style.display = "none";
-
-      const blob = new Blob(chunks, { type: chunks[0] ? chunks[0].type : "audio/webm" });
-      const mime = blob.type || "audio/webm";
-      const reader = new FileReader();
-      reader.onloadend = function() {
-        const dataUrl = reader.result;
-        const base64 = dataUrl.split(",")[1];
-        const filename = "recording_" + Date.now() + "." + (mime.includes("/") ? mime.split("/")[1] : "webm");
-        const payload = {
-          isStreamlitMessage: true,
-          type: "AUDIO_DATA",
-          data: base64,
-          mime: mime,
-          filename: filename
-        };
-        sendToStreamlit(payload);
-        statusEl.innerText = "Processing complete!";
-      };
-      reader.readAsDataURL(blob);
-
-      try { gumStream.getTracks().forEach(t => t.stop()); } catch(e){}
-    };
-
-    mediaRecorder.start();
-    timerInterval = setInterval(function(){
-      elapsed += 1;
-      timerEl.innerText = formatTime(elapsed);
-      updateTask(elapsed);
-     
-      // Auto-stop after max duration
-      if (elapsed >= maxDuration) {
-        stopRecording();
-      }
-    }, 1000);
-   
-  } catch (err) {
-    statusEl.innerText = "Error: " + err.message;
-    recBtn.disabled = false;
-    recBtn.style.display = "inline-block";
-    stopBtn.style.display = "none";
-    try { clearInterval(timerInterval); } catch(e){}
-  }
-}
-
-function stopRecording() {
-  try {
-    if (mediaRecorder && mediaRecorder.state === "recording") {
-      mediaRecorder.stop();
-    }
-  } catch(e){}
-}
-
-recBtn.addEventListener("click", startRecording);
-stopBtn.addEventListener("click", stopRecording);
-</script>
-"""
+# Audio recorder component (60 seconds max): streams the recording back in chunks
+audio_recorder = components.declare_component("audio_recorder", path=str(Path(__file__).parent / "audio_recorder"))
 
 # ------------------------
 # Session State Initialization
@@ -270,17 +94,26 @@ def initialize_session_state():
     defaults = {
         "page": "patient_register",
         "doctor": None,
-        "user": None,
+        "patient_id": None,  # The record itself is read through current_patient()
         "current_visit_index": -1,
-        "video_file": None,
+        "edit_base": None,  # (page, patient key, base) the page's next save is checked against
+        "video_file_id": None,  # file_id of the camera photo/clip saved to video_path
         "video_scores": None,
+        "video_measurements": None,  # Tremor frequency/band power per tremor task
+        "video_path": None,  # Saved copy of the recording; its bytes are not kept in session state
+        "video_quality": None,  # check_recording_quality() report for video_path
         "video_probs": None,
         "audio_file": None,
         "audio_scores": None,
+        "audio_measurements": None,  # Speech rate, pauses, voice activity of the recording
         "audio_probs": None,
+        "assessment_id": None,  # Identifies the current video/audio results for write-once saving
         "start_time": None,
         "recording_active": False,
-        "streamlit_message": None,
+        "video_job": None,  # Background analysis in progress: job id and recording path
+        "audio_job": None,
+        "audio_upload": None,  # Recording being streamed in chunks: id, path, bytes received, total
+        "audio_recorder_run": 0,  # Part of the recorder's key; a new value gives a fresh recorder
         "audio_processed": False,
         "audio_bytes": None,
         "doctor_tmp": {},
@@ -294,33 +127,118 @@ def initialize_session_state():
 
 initialize_session_state()
 
+def start_new_assessment():
+    """Mark freshly computed analysis results as not yet persisted"""
+    st.session_state["assessment_id"] = uuid.uuid4().hex
+
 # ------------------------
 # Helper Functions
 # ------------------------
-def load_users():
-    if os.path.exists(USERS_FILE):
-        with open(USERS_FILE, "r") as f:
-            try:
-                users = json.load(f)
-                for email, user in users.items():
-                    if "patient_id" not in user:
-                        user["patient_id"] = generate_unique_patient_id(users)
-                save_users(users)
-                return users
-            except Exception:
-                return {}
-    return {}
-
-def save_users(users):
-    with open(USERS_FILE, "w") as f:
-        json.dump(users, f, indent=2)
-
-def generate_unique_patient_id(users):
-    existing_ids = {user.get("patient_id") for user in users.values() if user.get("patient_id")}
-    while True:
-        patient_id = f"{random.randint(100000, 999999):06d}"
-        if patient_id not in existing_ids:
-            return patient_id
+@st.cache_resource
+def get_store():
+    """Open the patient database once per server process"""
+    if STORE_BACKEND == "sharded":
+        store = ShardedPatientStore(UPLOAD_BASE)
+    else:
+        store = PatientStore(DB_FILE)
+    store.migrate_from_json(USERS_FILE)
+    backfill_patient_ids(store)
+    return store
+
+def backfill_patient_ids(store):
+    """One-time startup migration: give legacy records without a patient_id one"""
+    for email in store.keys_without_patient_id():
+        store.update_patient(email, {"patient_id": store.allocate_patient_id()})
+
+def find_user_key(patient_id):
+    """Look up a patient's storage key through the store's patient_id index"""
+    return get_store().key_for_patient_id(patient_id)
+
+def remember_rendered(*fields, visits=(), visit_fields=()):
+    """Keep the version and ``fields`` of the record the page first rendered as its save base.
+
+    For the visits at the indexes in ``visits`` (None for every visit) only
+    the visit_id and ``visit_fields`` are kept, never whole visits with
+    their assessments and analyses. Taken once per visit to a page (main()
+    drops it when the page changes) and kept across the reruns of editing,
+    so a save made minutes later is still checked against what the user
+    actually saw.
+    """
+    user_key = find_user_key(st.session_state.get("patient_id"))
+    edit_base = st.session_state.get("edit_base")
+    if not user_key or (edit_base is not None and edit_base[1] == user_key):
+        return
+    patient = get_store().read_patient(user_key)
+    if patient is not None:
+        base = {field: patient[field] for field in fields if field in patient}
+        base["version"] = patient.get("version", 0)
+        patient_visits = patient.get("visits", [])
+        indexes = range(len(patient_visits)) if visits is None else visits
+        base["visits"] = {
+            i: dict({field: patient_visits[i].get(field) for field in visit_fields},
+                    visit_id=patient_visits[i].get("visit_id"))
+            for i in indexes if 0 <= i < len(patient_visits)
+        }
+        st.session_state["edit_base"] = (st.session_state.get("page"), user_key, base)
+
+def flash(message):
+    """Show ``message`` as a success note at the top of the next page rendered.
+
+    For confirmations followed by st.rerun(), which would clear a
+    st.success() before anyone saw it.
+    """
+    st.session_state.setdefault("flash", []).append(message)
+
+def update_current_patient(write, *args):
+    """Apply a store write (e.g. get_store().update_visit) to the session's patient.
+
+    The version and fields the page rendered (see remember_rendered) are
+    passed as the base, so the store merges concurrent edits to other
+    fields and only refuses writes that overlap with a change another
+    session made since. The base is dropped after a save or a conflict,
+    and the next rerun takes a new one from the latest data. Returns
+    (success, result).
+    """
+    user_key = find_user_key(st.session_state.get("patient_id"))
+    if not user_key:
+        return False, "Patient record not found"
+    edit_base = st.session_state.get("edit_base")
+    base = edit_base[2] if edit_base is not None and edit_base[1] == user_key else None
+    st.session_state["edit_base"] = None
+    try:
+        result = write(user_key, *args, base=base)
+    except ConflictError as e:
+        return False, f"{e}. The latest data has been loaded, please review and save again."
+    return True, result
+
+def current_patient():
+    """The session's patient as a shared read-only record, or None.
+
+    Session state only holds the patient_id and current_visit_index (and,
+    while a page is being edited, the few fields of its save base); the
+    record comes from the store's per-process read cache, so it is never
+    copied into (or kept alive by) a session.
+    """
+    user_key = find_user_key(st.session_state.get("patient_id"))
+    return get_store().read_patient(user_key) if user_key else None
+
+def get_patient_fields(*fields):
+    """Only the requested fields of the session's patient, or None"""
+    patient = current_patient()
+    if patient is None:
+        return None
+    return {field: patient[field] for field in fields if field in patient}
+
+def get_current_visit():
+    """The session's current visit (shared, read-only), or None"""
+    patient = current_patient()
+    visit_index = st.session_state.get("current_visit_index", -1)
+    if patient is None or not 0 <= visit_index < len(patient.get("visits", [])):
+        return None
+    return patient["visits"][visit_index]
+
+def generate_unique_patient_id():
+    return get_store().allocate_patient_id()
 
 def validate_phone_number(phone):
     """Validate phone number - must be exactly 10 digits"""
@@ -350,7 +268,7 @@ def safe_selectbox_index(options_list, value, default):
     except ValueError:
         return 0
 
-def save_audio_file(file_bytes, filename, user_id="guest"):
+def save_user_file(file_bytes, filename, user_id="guest"):
     user_dir = os.path.join(UPLOAD_BASE, str(user_id))
     os.makedirs(user_dir, exist_ok=True)
     path = os.path.join(user_dir, filename)
@@ -358,97 +276,115 @@ def save_audio_file(file_bytes, filename, user_id="guest"):
         fh.write(file_bytes)
     return path
 
-# Analysis functions (mock implementations)
-def analyze_frame(frame):
-    return {
-        "Facial expressions & blink rate": np.random.rand(),
-        "Resting tremor & postural tremor": np.random.rand(),
-        "Finger tapping (bradykinesia)": np.random.rand(),
-        "Arm swing & gait": np.random.rand(),
-        "Postural stability": np.random.rand(),
-        "Facial symmetry & head tremor": np.random.rand(),
-    }
-
-def analyze_audio_simple():
-    return {
-        "Speech rate & fluency": np.random.rand(),
-        "Voice quality & stability": np.random.rand(),
-        "Articulation precision": np.random.rand(),
-        "Pause patterns": np.random.rand(),
-        "Monotonicity": np.random.rand(),
-        "Word finding ability": np.random.rand(),
-        "Semantic coherence": np.random.rand(),
-        "Memory recall": np.random.rand(),
-        "Cognitive processing": np.random.rand(),
-        "Neurological speech markers": np.random.rand(),
-    }
-
-def compute_video_probabilities(avg_scores):
-    risk_score = np.mean(list(avg_scores.values()))
-    
-    # Adjust for more realistic screening - most people should be normal
-    # Use inverse relationship: lower risk_score = higher normal probability
-    normal_prob = max(0.3, 1 - risk_score * 1.2)  # Minimum 30% normal chance
-    
-    # Distribute remaining probability among conditions
-    remaining_prob = max(0.1, 1 - normal_prob)
-    
-    probs = {
-        "Normal": round(normal_prob, 2),
-        "Parkinson's": round(remaining_prob * 0.35, 2),
-        "Stroke": round(remaining_prob * 0.25, 2),
-        "Alzheimer's": round(remaining_prob * 0.25, 2),
-        "Brain Tumor": round(remaining_prob * 0.15, 2)
-    }
-    
-    # Normalize to ensure sum = 1
-    total = sum(probs.values())
-    if total > 0:
-        probs = {k: round(v/total, 2) for k, v in probs.items()}
-    
-    return probs
-
-def compute_audio_probabilities(avg_scores):
-    risk_score = np.mean(list(avg_scores.values()))
-    
-    # Similar adjustment for audio - favor normal cases
-    normal_prob = max(0.35, 1 - risk_score * 1.1)  # Minimum 35% normal chance
-    
-    # Distribute remaining probability among conditions
-    remaining_prob = max(0.1, 1 - normal_prob)
-    
-    probs = {
-        "Normal": round(normal_prob, 2),
-        "Parkinson's": round(remaining_prob * 0.30, 2),
-        "Alzheimer's": round(remaining_prob * 0.30, 2),
-        "Stroke": round(remaining_prob * 0.25, 2),
-        "Brain Tumor": round(remaining_prob * 0.15, 2)
-    }
-    
-    # Normalize to ensure sum = 1
-    total = sum(probs.values())
-    if total > 0:
-        probs = {k: round(v/total, 2) for k, v in probs.items()}
-    
-    return probs
-
-def combine_predictions(video_probs, audio_probs):
-    combined = {}
-    video_weight = 0.6
-    audio_weight = 0.4
-   
-    all_conditions = set(list(video_probs.keys()) + list(audio_probs.keys()))
-   
-    for condition in all_conditions:
-        video_score = video_probs.get(condition, 0)
-        audio_score = audio_probs.get(condition, 0)
-        combined[condition] = round(video_score * video_weight + audio_score * audio_weight, 2)
-   
-    total = sum(combined.values())
-    if total > 0:
-        combined = {k: round(v/total, 2) for k, v in combined.items()}
-   
-    return combined
+def save_video_recording(video_file):
+    """Save the captured photo/clip under the current patient and return its path"""
+    suffix = os.path.splitext(getattr(video_file, "name", ""))[1] or ".jpg"
+    data = video_file.getvalue() if hasattr(video_file, "getvalue") else bytes(video_file)
+    return save_user_file(data, f"video_{int(time.time())}{suffix}",
+                          st.session_state.get("patient_id") or "guest")
+
+def parse_audio_chunk(raw):
+    """Split a recorder chunk frame into (header, payload); None if ``raw`` is not one.
+
+    Frame layout: 4-byte big-endian header length, UTF-8 JSON header, raw media bytes.
+    """
+    if not isinstance(raw, (bytes, bytearray, memoryview)) or len(raw) < 4:
+        return None
+    raw = bytes(raw)
+    size = int.from_bytes(raw[:4], "big")
+    try:
+        header = json.loads(raw[4:4 + size].decode("utf-8"))
+    except ValueError:
+        return None
+    if not isinstance(header, dict) or header.get("type") != "AUDIO_CHUNK":
+        return None
+    return header, raw[4 + size:]
+
+def append_audio_chunk(header, payload, user_id="guest"):
+    """Write one recorder chunk at its offset in the recording file; False if it was already stored"""
+    upload = st.session_state.get("audio_upload")
+    if not upload or upload["id"] != header["id"]:
+        extension = (header.get("mime") or "audio/webm").split("/")[-1].split(";")[0] or "webm"
+        path = save_user_file(b"", f"recording_{int(time.time())}.{extension}", user_id)
+        upload = {"id": header["id"], "path": path, "seqs": [], "received": 0, "total": None}
+        st.session_state.audio_upload = upload
+   
+    # The component keeps returning its last value on every rerun, and resends unacknowledged chunks
+    if header["seq"] in upload["seqs"]:
+        return False
+    with open(upload["path"], "r+b") as fh:
+        fh.seek(header["offset"])
+        fh.write(payload)
+    upload["seqs"].append(header["seq"])
+    upload["received"] += len(payload)
+    if header.get("final"):
+        upload["total"] = header["total"]
+    return True
+
+def discard_audio_upload():
+    """Forget the streamed recording and start the next one on a fresh recorder"""
+    st.session_state.audio_upload = None
+    st.session_state.audio_recorder_run += 1
+
+@st.cache_resource
+def get_job_queue():
+    """Analysis process pool shared by all sessions of this server process"""
+    return JobQueue(get_analysis_cache())
+
+@st.cache_resource
+def get_model_registry():
+    """Analysis models of this server process, loaded once and shared read-only by all sessions"""
+    MODELS.warm()
+    return MODELS
+
+@st.cache_resource
+def get_analysis_cache():
+    """Analysis results shared by all sessions; a recording is never analysed twice"""
+    return AnalysisCache(ANALYSIS_CACHE_DIR)
+
+def submit_analysis(kind, path):
+    """Queue ``path`` for analysis unless its result is cached; returns the session's job record"""
+    if not os.path.exists(path):
+        raise ValueError(f"Recording not found: {path}")
+    job = {"path": path, "cache_key": cache_key(kind, analyzer_versions()[kind], recording_hash(path)), "id": None}
+    if get_analysis_cache().get(job["cache_key"]) is None:
+        job["id"] = get_job_queue().submit(kind, path, job["cache_key"])
+    st.session_state[f"{kind}_job"] = job
+    return job
+
+def run_analysis_job(kind, path):
+    """Analyse ``path`` in the background; the (scores, measurements) result once done, else None.
+
+    The first call submits the job and later reruns poll it, refreshing
+    the page until it finishes. Results come from get_analysis_cache()
+    when the same recording was analysed before by the same analyser
+    version. A failed analysis re-raises its error.
+    """
+    key = f"{kind}_job"
+    queue = get_job_queue()
+    job = st.session_state.get(key)
+    if job is None or job["path"] != path:
+        job = submit_analysis(kind, path)
+   
+    cached = get_analysis_cache().get(job["cache_key"])
+    if cached is not None:
+        st.session_state[key] = None
+        return cached
+    if job["id"] is None:
+        # Was cached at submit time but the entry has since gone
+        job = submit_analysis(kind, path)
+   
+    status, value = queue.poll(job["id"])
+    if status not in (DONE, FAILED):
+        st.info(f"Analyzing {kind}... This may take a moment.")
+        st_autorefresh(interval=JOB_POLL_INTERVAL_MS, key=f"{key}_poll")
+        return None
+    st.session_state[key] = None
+    queue.forget(job["id"])
+    if status == FAILED:
+        raise value
+    # The queue itself stores each result in get_analysis_cache() when the job finishes
+    return value
 
 def create_radar_chart(scores, title="Feature Scores"):
     categories = list(scores.keys())
@@ -501,12 +437,11 @@ def page_patient_register():
                 elif not phone_valid:
                     st.error(f"Invalid phone number: {phone_message}")
                 else:
-                    users = load_users()
-                    patient_id = generate_unique_patient_id(users)
+                    patient_id = generate_unique_patient_id()
                    
                     patient_email = f"patient_{patient_id}@neurohealth.com"
                    
-                    users[patient_email] = {
+                    patient = {
                         "patient_id": patient_id,
                         "name": name,
                         "age": int(age),
@@ -516,12 +451,11 @@ def page_patient_register():
                         "visits": [],
                         "created_date": str(date.today())
                     }
-                    save_users(users)
+                    get_store().insert_patient(patient_email, patient)
                    
-                    st.session_state["user"] = users[patient_email]
-                    st.success(f"Patient registered successfully! Patient ID: {patient_id}")
-                    st.success(f"Assigned Doctor: {selected_doctor}")
-                    time.sleep(2)
+                    st.session_state["patient_id"] = patient_id
+                    flash(f"Patient registered successfully! Patient ID: {patient_id}")
+                    flash(f"Assigned Doctor: {selected_doctor}")
                     st.session_state["page"] = "home"
                     st.rerun()
        
@@ -553,8 +487,7 @@ def page_doctor_login():
                 if doctor_found:
                     st.session_state["doctor"] = doctor_found
                     st.session_state["page"] = "doctor_dashboard"
-                    st.success(f"Login successful! Welcome {doctor_found['name']}")
-                    time.sleep(1)
+                    flash(f"Login successful! Welcome {doctor_found['name']}")
                     st.rerun()
                 else:
                     st.error("Invalid credentials. Please check username and password.")
@@ -576,30 +509,38 @@ def page_doctor_dashboard():
         st.rerun()
         return
    
-    # Load patients assigned to this doctor
-    users = load_users()
-    doctor_patients = []
-   
-    for user_email, user_data in users.items():
-        if user_data.get("assigned_doctor") == doctor["name"]:
-            doctor_patients.append((user_email, user_data))
+    # Load patients assigned to this doctor (doctor index + maintained counters)
+    store = get_store()
+    stats = store.doctor_stats(doctor["name"])
    
     # Display statistics
     col1, col2, col3 = st.columns(3)
    
     with col1:
-        st.metric("Total Patients", len(doctor_patients))
+        st.metric("Total Patients", stats["patients"])
    
     with col2:
-        patients_with_visits = sum(1 for _, patient in doctor_patients if patient.get("visits"))
-        st.metric("Patients with Visits", patients_with_visits)
+        st.metric("Patients with Visits", stats["patients_with_visits"])
    
     with col3:
-        total_visits = sum(len(patient.get("visits", [])) for _, patient in doctor_patients)
-        st.metric("Total Visits", total_visits)
+        st.metric("Total Visits", stats["visits"])
    
     st.markdown("---")
-    st.subheader(f"Your Patients ({len(doctor_patients)} total)")
+    st.subheader(f"Your Patients ({stats['patients']} total)")
+   
+    # Search and paginate in the store; only the current page is rendered
+    query = st.text_input("Search patients", placeholder="Name, phone or patient ID")
+    if query != st.session_state.get("dashboard_query"):
+        st.session_state["dashboard_query"] = query
+        st.session_state["dashboard_page"] = 0
+    page = st.session_state.get("dashboard_page", 0)
+    total, doctor_patients = store.search_patients(
+        doctor["name"], query, offset=page * PATIENTS_PER_PAGE, limit=PATIENTS_PER_PAGE)
+    page_count = max(1, -(-total // PATIENTS_PER_PAGE))
+    if page >= page_count:
+        page = st.session_state["dashboard_page"] = page_count - 1
+        total, doctor_patients = store.search_patients(
+            doctor["name"], query, offset=page * PATIENTS_PER_PAGE, limit=PATIENTS_PER_PAGE)
    
     if doctor_patients:
         for user_email, patient in doctor_patients:
@@ -616,19 +557,45 @@ def page_doctor_dashboard():
                
                 with col3:
                     st.write(f"Phone: {patient.get('phone')}")
-                    visits_count = len(patient.get('visits', []))
-                    st.write(f"Visits: {visits_count}")
+                    st.write(f"Visits: {patient.get('visit_count', 0)}")
                
                 with col4:
                     if st.button("Select", key=f"select_{patient.get('patient_id')}"):
-                        st.session_state["user"] = patient
+                        st.session_state["patient_id"] = patient.get("patient_id")
                         st.session_state["page"] = "home"
                         st.rerun()
                
                 st.markdown("---")
+       
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("Previous", disabled=page == 0, use_container_width=True):
+                st.session_state["dashboard_page"] = page - 1
+                st.rerun()
+        with col2:
+            st.write(f"Page {page + 1} of {page_count} ({total} patients)")
+        with col3:
+            if st.button("Next", disabled=page + 1 >= page_count, use_container_width=True):
+                st.session_state["dashboard_page"] = page + 1
+                st.rerun()
+    elif query:
+        st.info("No patients match your search.")
     else:
         st.info("No patients assigned to you yet.")
    
+    # Models behind the analyses; worker processes each load their own copy on start
+    with st.expander("Analysis Models"):
+        st.dataframe(pd.DataFrame([
+            {
+                "Model": info.name,
+                "Analysis": info.kind,
+                "Version": info.version,
+                "Load Time (ms)": round(info.load_seconds * 1000, 1),
+                "Memory (KB)": None if info.nbytes is None else round(info.nbytes / 1024),
+            }
+            for info in get_model_registry().report()
+        ]), use_container_width=True, hide_index=True)
+   
     # Quick actions
     col1, col2 = st.columns(2)
     with col1:
@@ -672,12 +639,11 @@ def page_patient_register_by_doctor():
                 elif not phone_valid:
                     st.error(f"Invalid phone number: {phone_message}")
                 else:
-                    users = load_users()
-                    patient_id = generate_unique_patient_id(users)
+                    patient_id = generate_unique_patient_id()
                    
                     patient_email = f"patient_{patient_id}@neurohealth.com"
                    
-                    users[patient_email] = {
+                    patient = {
                         "patient_id": patient_id,
                         "name": name,
                         "age": int(age),
@@ -687,11 +653,10 @@ def page_patient_register_by_doctor():
                         "visits": [],
                         "created_date": str(date.today())
                     }
-                    save_users(users)
+                    get_store().insert_patient(patient_email, patient)
                    
-                    st.session_state["user"] = users[patient_email]
-                    st.success(f"Patient registered successfully! Patient ID: {patient_id}")
-                    time.sleep(1)
+                    st.session_state["patient_id"] = patient_id
+                    flash(f"Patient registered successfully! Patient ID: {patient_id}")
                     st.session_state["page"] = "home"
                     st.rerun()
        
@@ -703,8 +668,8 @@ def page_patient_register_by_doctor():
 def page_home():
     st.title("NeuroHealth Dashboard")
    
-    if "user" in st.session_state and st.session_state["user"]:
-        user = st.session_state["user"]
+    user = get_patient_fields("name", "patient_id", "assigned_doctor")
+    if user:
         st.header(f"Welcome, {user['name']}!")
        
         col1, col2, col3 = st.columns([1, 2, 1])
@@ -723,7 +688,7 @@ def page_home():
             col_a, col_b = st.columns(2)
             with col_a:
                 if st.button("Change Patient", use_container_width=True):
-                    st.session_state["user"] = None
+                    st.session_state["patient_id"] = None
                     if st.session_state.get("doctor"):
                         st.session_state["page"] = "doctor_dashboard"
                     else:
@@ -738,8 +703,9 @@ def page_home():
 def page_patient_info():
     st.title("Patient Information")
    
-    if "user" in st.session_state and st.session_state["user"]:
-        user = st.session_state["user"]
+    remember_rendered("name", "age", "blood_group", "phone")
+    user = get_patient_fields("name", "patient_id", "age", "blood_group", "phone", "assigned_doctor")
+    if user:
         st.header(f"Profile: {user['name']} (ID: {user.get('patient_id', 'N/A')})")
        
         col1, col2 = st.columns([2, 1])
@@ -766,48 +732,40 @@ def page_patient_info():
                 if not phone_valid:
                     st.error(f"Invalid phone number: {phone_message}")
                 else:
-                    users = load_users()
-                    user_key = None
-                    for key, u in users.items():
-                        if u.get("patient_id") == user.get("patient_id"):
-                            user_key = key
-                            break
-                   
-                    if user_key:
-                        users[user_key].update({
-                            "name": name,
-                            "age": int(age),
-                            "blood_group": blood_group if blood_group != "Select Blood Group" else user.get("blood_group"),
-                            "phone": phone_message  # Use cleaned phone number
-                        })
-                        save_users(users)
-                        st.session_state["user"] = users[user_key]
+                    fields = {
+                        "name": name,
+                        "age": int(age),
+                        "blood_group": blood_group if blood_group != "Select Blood Group" else user.get("blood_group"),
+                        "phone": phone_message  # Use cleaned phone number
+                    }
+                    # Only send what was edited, so other sessions' changes to the rest are kept
+                    changed = {field: value for field, value in fields.items() if value != user.get(field)}
+                    if not changed:
+                        ok, result = True, None
+                    else:
+                        ok, result = update_current_patient(get_store().update_patient, changed)
+                    if ok:
                         st.success("Profile updated successfully!")
+                    else:
+                        st.error(result)
 
         with col2:
             st.info("Quick Actions")
            
             if st.button("Add New Visit", use_container_width=True):
-                users = load_users()
-                user_key = None
-                for key, u in users.items():
-                    if u.get("patient_id") == user.get("patient_id"):
-                        user_key = key
-                        break
-               
-                if user_key:
-                    visit = {
-                        "date": str(date.today()),
-                        "reason": "",
-                        "hospital": "Primary Health Care Center",
-                        "doctor": user.get("assigned_doctor")
-                    }
-                    users[user_key]["visits"].append(visit)
-                    save_users(users)
-                    st.session_state["user"] = users[user_key]
-                    st.session_state["current_visit_index"] = len(users[user_key]["visits"]) - 1
+                visit = {
+                    "date": str(date.today()),
+                    "reason": "",
+                    "hospital": "Primary Health Care Center",
+                    "doctor": user.get("assigned_doctor")
+                }
+                ok, result = update_current_patient(get_store().add_visit, visit)
+                if ok:
+                    st.session_state["current_visit_index"] = result
                     st.session_state["page"] = "select_facility"
                     st.rerun()
+                else:
+                    st.error(result)
            
             if st.button("Back to Home", use_container_width=True):
                 st.session_state["page"] = "home"
@@ -816,8 +774,9 @@ def page_patient_info():
 def page_visiting_data():
     st.title("Medical Visit History")
    
-    if "user" in st.session_state and st.session_state["user"]:
-        user = st.session_state["user"]
+    remember_rendered(visits=None, visit_fields=("date", "reason", "hospital", "doctor"))
+    user = get_patient_fields("name", "patient_id", "assigned_doctor", "visits")
+    if user:
         st.header(f"Visits for {user['name']} (ID: {user.get('patient_id', 'N/A')})")
        
         if "visits" in user and user["visits"]:
@@ -841,18 +800,11 @@ def page_visiting_data():
                    
                     with col3:
                         if st.button(f"Delete {idx+1}", key=f"del_{idx}"):
-                            users = load_users()
-                            user_key = None
-                            for key, u in users.items():
-                                if u.get("patient_id") == user.get("patient_id"):
-                                    user_key = key
-                                    break
-                           
-                            if user_key:
-                                users[user_key]["visits"].pop(idx)
-                                save_users(users)
-                                st.session_state["user"] = users[user_key]
+                            ok, result = update_current_patient(get_store().delete_visit, idx)
+                            if ok:
                                 st.rerun()
+                            else:
+                                st.error(result)
                    
                     st.markdown("---")
         else:
@@ -865,15 +817,15 @@ def page_visiting_data():
 def page_select_facility():
     st.title("Visit Information")
    
-    if "user" in st.session_state and st.session_state["user"]:
-        user = st.session_state["user"]
+    remember_rendered(visits=[st.session_state.get("current_visit_index", -1)], visit_fields=("date", "reason"))
+    user = current_patient()
+    if user:
         visit_index = st.session_state.get("current_visit_index", -1)
+        visit = get_current_visit()
        
-        if visit_index < 0 or visit_index >= len(user.get("visits", [])):
+        if visit is None:
             st.error("No visit selected.")
             return
-           
-        visit = user["visits"][visit_index]
        
         col1, col2 = st.columns([2, 1])
         with col1:
@@ -884,25 +836,17 @@ def page_select_facility():
             st.info(f"Consulting Doctor: {user.get('assigned_doctor')}")
            
             if st.button("Save & Continue to Assessment"):
-                users = load_users()
-                user_key = None
-                for key, u in users.items():
-                    if u.get("patient_id") == user.get("patient_id"):
-                        user_key = key
-                        break
-               
-                if user_key:
-                    users[user_key]["visits"][visit_index].update({
-                        "reason": reason,
-                        "hospital": "Primary Health Care Center",
-                        "doctor": user.get('assigned_doctor'),
-                        "status": "completed"
-                    })
-                    save_users(users)
-                    st.session_state["user"] = users[user_key]
+                ok, result = update_current_patient(get_store().update_visit, visit_index, {
+                    "reason": reason,
+                    "hospital": "Primary Health Care Center",
+                    "doctor": user.get('assigned_doctor'),
+                    "status": "completed"
+                })
+                if not ok:
+                    st.error(result)
+                else:
                     st.session_state["assessment_section"] = 0  # Start with first section
-                    st.success("Visit information saved successfully!")
-                    time.sleep(1)
+                    flash("Visit information saved successfully!")
                     st.session_state["page"] = "doctor_assessment"
                     st.rerun()
        
@@ -920,15 +864,16 @@ def page_select_facility():
 def page_doctor_assessment():
     st.title("Doctor's Clinical Assessment")
    
-    if "user" in st.session_state and st.session_state["user"]:
-        user = st.session_state["user"]
+    remember_rendered(visits=[st.session_state.get("current_visit_index", -1)],
+                      visit_fields=("date", "doctor_assessment"))
+    user = current_patient()
+    if user:
         visit_index = st.session_state.get("current_visit_index", -1)
+        visit = get_current_visit()
        
-        if visit_index < 0 or visit_index >= len(user.get("visits", [])):
+        if visit is None:
             st.error("No visit selected.")
             return
-           
-        visit = user["visits"][visit_index]
         st.write(f"Assessment for Visit on {visit.get('date')} — Doctor: {user.get('assigned_doctor')}")
 
         # Get current section (default to 0)
@@ -950,7 +895,7 @@ def page_doctor_assessment():
        
         # Initialize doctor_tmp if not present
         if "doctor_tmp" not in st.session_state:
-            st.session_state["doctor_tmp"] = visit.get("doctor_assessment", {})
+            st.session_state["doctor_tmp"] = dict(visit.get("doctor_assessment", {}))
 
         # Section-specific content
         if current_section == 0:  # General Info
@@ -1126,20 +1071,13 @@ def page_doctor_assessment():
                         "assessing_doctor": user.get('assigned_doctor'),
                         "assessment_date": str(date.today())
                     })
-                    users = load_users()
-                    user_key = None
-                    for key, u in users.items():
-                        if u.get("patient_id") == user.get("patient_id"):
-                            user_key = key
-                            break
-                   
-                    if user_key:
-                        users[user_key]["visits"][visit_index]["doctor_assessment"] = doc_data
-                        save_users(users)
-                        st.session_state["user"] = users[user_key]
+                    ok, result = update_current_patient(get_store().set_assessment, visit_index, doc_data)
+                    if not ok:
+                        st.error(result)
+                    else:
                         st.session_state.pop("doctor_tmp", None)
                         st.session_state["assessment_section"] = 0  # Reset for next time
-                        st.success("Clinical assessment completed successfully!")
+                        flash("Clinical assessment completed successfully!")
                         st.session_state["page"] = "video_instructions"
                         st.rerun()
        
@@ -1186,8 +1124,8 @@ def page_video_instructions():
         - Remove distracting background
         """)
        
-        if "user" in st.session_state and st.session_state["user"]:
-            user = st.session_state["user"]
+        user = get_patient_fields("name", "patient_id")
+        if user:
             st.success(f"Patient: {user['name']}")
             st.info(f"ID: {user.get('patient_id', 'N/A')}")
    
@@ -1226,7 +1164,7 @@ def page_video_recording():
         st.markdown(f"### Time: {minutes:02d}:{seconds:02d} / 01:00")  # MODIFIED: Show 1:00 max
        
         # Current task - MODIFIED: 6 tasks, 10 seconds each
-        idx = min(elapsed // 10, len(FEATURE_GUIDELINES) - 1)
+        idx = min(elapsed // TASK_SECONDS, len(FEATURE_GUIDELINES) - 1)
         feature, description = FEATURE_GUIDELINES[idx]
        
         st.markdown(f"**Task {idx + 1}/6:**")  # MODIFIED: Show 6 tasks
@@ -1251,41 +1189,64 @@ def page_video_recording():
     with right:
         st.subheader("Camera Feed")
         video_file = st.camera_input("Recording Active - Take photo when done", key="video_camera")
+        uploaded_clip = st.file_uploader("Or upload the recorded clip", type=["mp4", "webm", "mov", "avi"])
+        video_file = uploaded_clip or video_file
        
         if video_file:
-            st.session_state.video_file = video_file
+            file_id = getattr(video_file, "file_id", None)
+            if file_id != st.session_state.video_file_id or not st.session_state.video_path:
+                # New recording: check it now, analyse it again later
+                st.session_state.video_scores = None
+                st.session_state.video_path = save_video_recording(video_file)
+                st.session_state.video_quality = check_recording_quality(st.session_state.video_path)
+            st.session_state.video_file_id = file_id
             st.session_state.recording_active = False
-            st.success("Video recording complete!")
            
-            if st.button("Analyze Video", use_container_width=True):
-                st.session_state["page"] = "video_analysis"
-                st.rerun()
+            quality = st.session_state.video_quality or {}
+            for warning in quality.get("warnings", []):
+                st.warning(warning)
+            if quality.get("ok", True):
+                st.success("Video recording complete!")
+               
+                if st.button("Analyze Video", use_container_width=True):
+                    st.session_state["page"] = "video_analysis"
+                    st.rerun()
+            else:
+                for problem in quality["problems"]:
+                    st.error(problem)
+                st.info("Please record again; this recording would not give a reliable analysis.")
 
 def page_video_analysis():
     st.title("Video Analysis Results")
    
-    if st.session_state.video_file is None:
+    if not st.session_state.video_path:
         st.error("No video found. Please record again.")
         if st.button("Record Again"):
             st.session_state["page"] = "video_recording"
             st.rerun()
         return
    
-    with st.spinner("Analyzing video... This may take a moment..."):
-        time.sleep(2)  # Simulate processing time
-       
-        # Create mock frame analysis
-        all_scores = []
-        for i in range(6):  # Simulate 6 frames for 6 tasks
-            all_scores.append(analyze_frame(None))
-       
-        # Average scores across frames
-        avg_scores = {k: np.mean([f[k] for f in all_scores]) for k in all_scores[0].keys()}
+    # Analyse each recording once; reruns of this page reuse the scores
+    if not st.session_state.video_scores or not st.session_state.video_probs:
+        try:
+            result = run_analysis_job("video", st.session_state.video_path)
+        except Exception as e:
+            st.error(f"Could not analyze the recording: {e}")
+            if st.button("Record Again"):
+                st.session_state["page"] = "video_recording"
+                st.rerun()
+            return
+        if result is None:
+            return
+        avg_scores, measurements = result
         st.session_state.video_scores = avg_scores
+        st.session_state.video_measurements = measurements
        
         # Compute probabilities
         probs = compute_video_probabilities(avg_scores)
         st.session_state.video_probs = probs
+        start_new_assessment()
+    avg_scores = st.session_state.video_scores
    
     st.success("Video analysis complete!")
    
@@ -1317,6 +1278,10 @@ def page_video_analysis():
             with col1:
                 st.markdown(f"**{feature}**")
                 st.caption(description)
+                tremor = (st.session_state.video_measurements or {}).get(feature)
+                if tremor and tremor.get("dominant_hz") is not None:
+                    st.caption(f"Dominant frequency: {tremor['dominant_hz']:.1f} Hz | "
+                               f"4-6 Hz band power: {tremor['band_power'] * 100:.0f}%")
            
             with col2:
                 st.metric("Risk Score", f"{score:.2f}")
@@ -1396,7 +1361,7 @@ def page_audio_recording():
         with col2:
             if st.button("Record Again", use_container_width=True):
                 st.session_state.audio_processed = False
-                st.session_state.streamlit_message = None
+                discard_audio_upload()
                 if "audio_bytes" in st.session_state:
                     del st.session_state["audio_bytes"]
                 st.rerun()
@@ -1410,24 +1375,34 @@ def page_audio_recording():
     st.markdown("### Record Your Speech")
     st.info("The recording will guide you through 4 tasks automatically.")
    
-    # Audio recorder component
-    comp_val = st.components.v1.html(AUDIO_RECORDER_HTML, height=350)
-   
-    # Handle audio data
-    if comp_val and isinstance(comp_val, dict) and comp_val.get("type") == "AUDIO_DATA":
-        st.session_state.streamlit_message = comp_val
+    # Audio recorder component. The last chunk stored goes back to it as the
+    # acknowledgement; until then it resends that chunk, after it sends the next.
+    upload = st.session_state.get("audio_upload")
+    comp_val = audio_recorder(received_id=upload["id"] if upload else None,
+                              received_seq=upload["seqs"][-1] if upload and upload["seqs"] else -1,
+                              key=f"audio_recorder_{st.session_state.audio_recorder_run}", default=None)
+   
+    # Chunks arrive every second while recording and are appended to the recording file
+    chunk = parse_audio_chunk(comp_val)
+    if chunk and append_audio_chunk(*chunk, st.session_state.get("patient_id") or "guest"):
+        st.rerun()  # Render the acknowledgement
+   
+    if upload and upload["total"] is None:
+        st.info(f"Receiving recording... {upload['received'] / 1024:.0f} KB so far")
+   
+    elif upload and upload["received"] != upload["total"]:
+        st.error("Part of the recording did not arrive. Please record again.")
+        if st.button("Record Again", use_container_width=True):
+            discard_audio_upload()
+            st.rerun()
    
-    msg = st.session_state.get("streamlit_message")
-    if msg and isinstance(msg, dict) and msg.get("type") == "AUDIO_DATA":
-        b64 = msg.get("data")
-        filename = msg.get("filename", f"recording_{int(time.time())}.webm")
-       
+    elif upload:
         try:
-            audio_bytes = base64.b64decode(b64)
-            st.session_state.audio_bytes = audio_bytes
-           
-            audio_file_path = save_audio_file(audio_bytes, filename, "current_user")
+            audio_file_path = upload["path"]
             st.session_state.audio_file = audio_file_path
+            with open(audio_file_path, "rb") as fh:
+                audio_bytes = fh.read()
+            st.session_state.audio_bytes = audio_bytes
            
             st.success("Audio recording complete!")
             st.audio(audio_bytes)
@@ -1438,27 +1413,16 @@ def page_audio_recording():
             col1, col2 = st.columns([2, 1])
             with col1:
                 if st.button("Process & Analyze Audio", use_container_width=True, type="primary"):
-                    st.session_state.audio_processed = True
-                   
-                    with st.spinner("Analyzing audio..."):
-                        time.sleep(2)
-                       
-                        audio_scores = analyze_audio_simple()
-                        st.session_state.audio_scores = audio_scores
-                       
-                        audio_probs = compute_audio_probabilities(audio_scores)
-                        st.session_state.audio_probs = audio_probs
-                   
-                    st.success("Audio analysis complete!")
-                    st.balloons()
-                   
-                    time.sleep(1)
+                    # Queue the analysis now; the results page picks up the running job
+                    st.session_state.audio_scores = None
+                    st.session_state.audio_probs = None
+                    submit_analysis("audio", audio_file_path)
                     st.session_state["page"] = "audio_analysis"
                     st.rerun()
            
             with col2:
                 if st.button("Record Again", use_container_width=True):
-                    st.session_state.streamlit_message = None
+                    discard_audio_upload()
                     if "audio_bytes" in st.session_state:
                         del st.session_state["audio_bytes"]
                     st.rerun()
@@ -1496,14 +1460,31 @@ def page_audio_analysis():
    
     # Generate analysis if not present
     if not st.session_state.audio_scores or not st.session_state.audio_probs:
-        with st.spinner("Analyzing audio features..."):
-            time.sleep(2)
-           
-            audio_scores = analyze_audio_simple()
-            st.session_state.audio_scores = audio_scores
-           
-            audio_probs = compute_audio_probabilities(audio_scores)
-            st.session_state.audio_probs = audio_probs
+        if not st.session_state.audio_file:
+            st.error("No audio recording found. Please record again.")
+            if st.button("Record Audio"):
+                st.session_state["page"] = "audio_recording"
+                st.rerun()
+            return
+        try:
+            result = run_analysis_job("audio", st.session_state.audio_file)
+        except Exception as e:
+            st.error(f"Could not analyze the recording: {e}")
+            if st.button("Record Again"):
+                st.session_state.audio_processed = False
+                st.session_state["page"] = "audio_recording"
+                st.rerun()
+            return
+        if result is None:
+            return
+        audio_scores, measurements = result
+        st.session_state.audio_scores = audio_scores
+        st.session_state.audio_measurements = measurements
+        st.session_state.audio_processed = True
+       
+        audio_probs = compute_audio_probabilities(audio_scores)
+        st.session_state.audio_probs = audio_probs
+        start_new_assessment()
    
     st.success("Audio analysis complete!")
    
@@ -1524,6 +1505,20 @@ def page_audio_analysis():
         fig_radar = create_radar_chart(st.session_state.audio_scores, "Audio Analysis")
         st.plotly_chart(fig_radar, use_container_width=True)
    
+    measurements = st.session_state.audio_measurements
+    if measurements:
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Speech Time", f"{measurements['speech_seconds']:.0f} s")
+        col2.metric("Speech Rate", f"{measurements['speech_rate']:.1f} syll/s")
+        col3.metric("Pauses", measurements["pause_count"])
+        col4.metric("Mean Pause", f"{measurements['mean_pause_seconds']:.1f} s")
+        if measurements.get("f0_median"):
+            pitch = (f"Pitch: {measurements['f0_median']:.0f} Hz median, "
+                     f"{measurements['pitch_std_semitones']:.1f} semitones variation")
+            if measurements["pitch_modulation_hz"]:
+                pitch += f" | Pitch modulation: {measurements['pitch_modulation_hz']:.1f} Hz"
+            st.caption(pitch)
+   
     # Detailed breakdown
     st.subheader("Detailed Feature Analysis")
    
@@ -1557,15 +1552,16 @@ def page_audio_analysis():
 def page_final_results():
     st.title("Complete NeuroHealth Assessment")
    
-    if "user" in st.session_state and st.session_state["user"]:
-        user = st.session_state["user"]
-        visit_index = st.session_state.get("current_visit_index", -1)
-       
+    # The analysis is written by this same render, so only the visit's identity is checked
+    remember_rendered(visits=[st.session_state.get("current_visit_index", -1)])
+    user = get_patient_fields("name", "patient_id", "age", "blood_group", "assigned_doctor")
+    visit = get_current_visit()
+    visit_index = st.session_state.get("current_visit_index", -1)
+    if user:
         st.markdown(f"### Patient: {user['name']}, ID: {user.get('patient_id', 'N/A')}, Age: {user.get('age', 'N/A')}")
         st.markdown(f"### Blood Group: {user.get('blood_group', 'N/A')}, Doctor: {user.get('assigned_doctor', 'N/A')}")
        
-        if visit_index >= 0 and visit_index < len(user.get("visits", [])):
-            visit = user["visits"][visit_index]
+        if visit is not None:
             st.markdown(f"**Visit Date:** {visit.get('date')} | **Doctor:** {visit.get('doctor', 'N/A')}")
    
     if not st.session_state.video_probs or not st.session_state.audio_probs:
@@ -1573,9 +1569,8 @@ def page_final_results():
         return
    
     # Display Clinical Assessment First
-    if "user" in st.session_state and visit_index >= 0:
-        visit = user.get("visits", [])[visit_index] if visit_index < len(user.get("visits", [])) else {}
-        doctor_assessment = visit.get("doctor_assessment")
+    doctor_assessment = visit.get("doctor_assessment") if visit is not None else None
+    if user and visit is not None:
        
         if doctor_assessment:
             st.subheader("Clinical Assessment Summary")
@@ -1621,8 +1616,16 @@ def page_final_results():
            
             st.markdown("---")
    
-    # Combine predictions
-    combined_probs = combine_predictions(st.session_state.video_probs, st.session_state.audio_probs)
+    # Combine predictions once per assessment; later reruns reuse the stored result
+    if not st.session_state.get("assessment_id"):
+        start_new_assessment()
+    assessment_id = st.session_state["assessment_id"]
+    stored_analysis = visit.get("multimodal_analysis") if visit is not None else None
+    analysis_saved = bool(stored_analysis) and stored_analysis.get("assessment_id") == assessment_id
+    if analysis_saved:
+        combined_probs = stored_analysis["combined_probs"]
+    else:
+        combined_probs = combine_predictions(st.session_state.video_probs, st.session_state.audio_probs)
    
     # AI Analysis Results
     st.subheader("AI Analysis Results (Multi-Modal)")
@@ -1793,27 +1796,26 @@ def page_final_results():
         else:
             st.info("Continue regular monitoring and follow-up care at the Primary Health Care Center. Schedule follow-up if symptoms develop or worsen.")
    
-    # Save results to user visit
-    if "user" in st.session_state and st.session_state["user"] and visit_index >= 0:
-        users = load_users()
-        user_key = None
-        for key, u in users.items():
-            if u.get("patient_id") == user.get("patient_id"):
-                user_key = key
-                break
-       
-        if user_key and visit_index < len(users[user_key]["visits"]):
-            analysis_results = {
-                "video_scores": st.session_state.video_scores,
-                "video_probs": st.session_state.video_probs,
-                "audio_scores": st.session_state.audio_scores,
-                "audio_probs": st.session_state.audio_probs,
-                "combined_probs": combined_probs,
-                "analysis_date": str(date.today())
-            }
-            users[user_key]["visits"][visit_index]["multimodal_analysis"] = analysis_results
-            save_users(users)
-            st.session_state["user"] = users[user_key]
+    # Save results to user visit (only the first render of this assessment writes)
+    if user and visit is not None and not analysis_saved:
+        analysis_results = {
+            "assessment_id": assessment_id,
+            "video_scores": st.session_state.video_scores,
+            "video_measurements": st.session_state.video_measurements,
+            "video_probs": st.session_state.video_probs,
+            "audio_scores": st.session_state.audio_scores,
+            "audio_measurements": st.session_state.audio_measurements,
+            "audio_probs": st.session_state.audio_probs,
+            "combined_probs": combined_probs,
+            # Recordings and analysers behind the scores, for batch_rescore.py
+            "video_path": st.session_state.video_path,
+            "audio_file": st.session_state.audio_file,
+            "analyzer_versions": analyzer_versions(),
+            "analysis_date": str(date.today())
+        }
+        ok, result = update_current_patient(get_store().set_analysis, visit_index, analysis_results)
+        if not ok:
+            st.warning(result)
    
     st.markdown("---")
    
@@ -1823,9 +1825,10 @@ def page_final_results():
     with col1:
         if st.button("New Assessment", use_container_width=True):
             # Reset analysis variables
-            for key in ["video_file", "video_scores", "video_probs", "audio_file",
-                        "audio_scores", "audio_probs", "start_time", "recording_active",
-                        "streamlit_message", "audio_processed", "audio_bytes", "assessment_section"]:
+            for key in ["video_file_id", "video_path", "video_quality", "video_scores", "video_measurements",
+                        "video_probs", "audio_file",
+                        "audio_scores", "audio_measurements", "audio_probs", "assessment_id", "start_time", "recording_active",
+                        "video_job", "audio_job", "audio_upload", "audio_processed", "audio_bytes", "assessment_section"]:
                 if key in st.session_state:
                     del st.session_state[key]
             st.session_state["page"] = "home"
@@ -1835,9 +1838,9 @@ def page_final_results():
         if st.button("Export Results", use_container_width=True):
             results_data = {
                 "patient_info": {
-                    "name": user.get("name") if "user" in st.session_state else "Unknown",
-                    "patient_id": user.get("patient_id") if "user" in st.session_state else "N/A",
-                    "age": user.get("age") if "user" in st.session_state else "N/A",
+                    "name": user.get("name") if user else "Unknown",
+                    "patient_id": user.get("patient_id") if user else "N/A",
+                    "age": user.get("age") if user else "N/A",
                     "assessment_date": str(date.today())
                 },
                 "combined_results": combined_probs,
@@ -1849,7 +1852,7 @@ def page_final_results():
             st.download_button(
                 label="Download JSON Report",
                 data=json.dumps(results_data, indent=2),
-                file_name=f"neurohealth_report_{user.get('patient_id', 'unknown')}_{date.today()}.json",
+                file_name=f"neurohealth_report_{(user or {}).get('patient_id', 'unknown')}_{date.today()}.json",
                 mime="application/json"
             )
    
@@ -1881,16 +1884,15 @@ def render_sidebar():
             st.success(f"Doctor: {doctor['name']}")
            
         # User info
-        if "user" in st.session_state and st.session_state["user"]:
-            user = st.session_state["user"]
+        user = get_patient_fields("name", "patient_id", "assigned_doctor")
+        if user:
             st.success(f"Patient: {user['name']}")
             st.info(f"ID: {user.get('patient_id', 'N/A')}")
             st.info(f"Doctor: {user.get('assigned_doctor', 'N/A')}")
            
             # Current visit info
-            visit_index = st.session_state.get("current_visit_index", -1)
-            if visit_index >= 0 and visit_index < len(user.get("visits", [])):
-                visit = user["visits"][visit_index]
+            visit = get_current_visit()
+            if visit is not None:
                 st.write(f"**Current Visit:** {visit.get('date')}")
                
                 # Assessment progress indicator
@@ -1899,6 +1901,7 @@ def render_sidebar():
                     st.write(f"**Assessment:** Section {current_section + 1}/5")
 
 def main():
+    get_model_registry()
     render_sidebar()
    
     # Page routing
@@ -1922,6 +1925,11 @@ def main():
     }
    
     current_page = st.session_state.get("page", "patient_register")
+    edit_base = st.session_state.get("edit_base")
+    if edit_base is not None and edit_base[0] != current_page:
+        st.session_state["edit_base"] = None
+    for message in st.session_state.pop("flash", []):
+        st.success(message)
    
     if current_page in page_functions:
         page_functions[current_page]()
@@ -0,0 +1,499 @@
+import os
+import shutil
+import subprocess
+import threading
+import wave
+from collections import OrderedDict
+
+import numpy as np
+
+from analysis_cache import recording_hash
+from model_registry import MODELS
+from scoring import saturate
+
+# ------------------------
+# Recording protocol
+# ------------------------
+# Feature names are the keys of the score dict returned by analyze_audio().
+AUDIO_FEATURES = [
+    ("Speech rate & fluency", "Analysis of speaking speed and smoothness of speech"),
+    ("Voice quality & stability", "Assessment of voice tremor and pitch variations"),
+    ("Articulation precision", "Clarity of consonants and vowel pronunciation"),
+    ("Pause patterns", "Frequency and duration of speech pauses"),
+    ("Monotonicity", "Variation in pitch and tone during speech"),
+    ("Word finding ability", "Ease of retrieving and expressing words"),
+    ("Semantic coherence", "Logical flow and meaning in speech"),
+    ("Memory recall", "Ability to remember and repeat information"),
+    ("Cognitive processing", "Speed of verbal responses and comprehension"),
+    ("Neurological speech markers", "Signs of motor speech disorders"),
+]
+
+# Four guided tasks of AUDIO_TASK_SECONDS each: reading, counting,
+# word recall (three fruits) and describing the surroundings.
+AUDIO_TASK_SECONDS = 15
+RECALL_TASK = 2
+
+# ------------------------
+# Engine settings
+# ------------------------
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.025
+HOP_SECONDS = 0.010
+SILENCE_FLOOR_DB = -60.0  # Frames quieter than this never count as speech
+
+# Voice activity: a frame is speech when it is VAD_MARGIN_DB above the
+# noise floor (10th percentile frame level) and within VAD_RANGE_DB of the
+# loudest frames. Gaps shorter than MIN_PAUSE_SECONDS are bridged.
+VAD_MARGIN_DB = 10.0
+VAD_RANGE_DB = 40.0
+MIN_PAUSE_SECONDS = 0.25
+LONG_PAUSE_SECONDS = 1.0
+MIN_SYLLABLE_GAP_SECONDS = 0.12
+
+# Pitch tracking (track_pitch, a batched YIN)
+F0_MIN = 60.0
+F0_MAX = 400.0
+YIN_WINDOW_SECONDS = 0.025
+YIN_THRESHOLD = 0.15  # First dip of the normalised difference below this is the period
+YIN_VOICED_MAX = 0.35  # Frames whose best dip stays above this are unvoiced
+# Vocal tremor: slow rhythmic modulation of the pitch contour
+VOCAL_TREMOR_BAND = (3.0, 8.0)
+PITCH_MODULATION_RANGE = (1.0, 15.0)
+
+# Spectral analysis shared by the extractors (Spectrogram)
+N_FFT = 512
+MEL_BANDS = 40
+# Low (voicing, first formant), mid (upper formants) and high (fricatives, bursts)
+ENERGY_BANDS = ((0, 1000), (1000, 4000), (4000, 8000))
+SPECTRAL_CACHE_SIZE = 8  # Recordings whose spectrograms stay in memory
+
+# Score used for a feature the recording gives no evidence for
+NEUTRAL_SCORE = 0.5
+
+ANALYZER_VERSION = 1  # See job_queue.ANALYZER_VERSIONS
+
+
+# ------------------------
+# Decoding
+# ------------------------
+def _resample(samples, source_rate, target_rate):
+    if source_rate == target_rate or not len(samples):
+        return samples
+    duration = len(samples) / source_rate
+    target = np.arange(int(duration * target_rate)) / target_rate
+    return np.interp(target, np.arange(len(samples)) / source_rate, samples).astype(np.float32)
+
+
+def _decode_wav(path, sample_rate):
+    with wave.open(path, "rb") as wav:
+        channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+        raw = wav.readframes(wav.getnframes())
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width in (2, 4):
+        dtype = np.int16 if width == 2 else np.int32
+        samples = np.frombuffer(raw, dtype=dtype).astype(np.float32) / np.iinfo(dtype).max
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width * 8} bits")
+    samples = samples.reshape(-1, channels).mean(axis=1)
+    return _resample(samples, rate, sample_rate)
+
+
+def _decode_ffmpeg(path, sample_rate):
+    # System dependency, installed from packages.txt alongside requirments.txt
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise ValueError("Decoding this recording needs ffmpeg installed on the server")
+    result = subprocess.run(
+        [ffmpeg, "-v", "error", "-i", path, "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "-"],
+        capture_output=True,
+    )
+    if result.returncode != 0:
+        raise ValueError(f"ffmpeg could not decode the recording: {result.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768
+
+
+def decode_audio(path, sample_rate=SAMPLE_RATE):
+    """Decode a recording to mono float32 PCM at ``sample_rate``.
+
+    WAV is read directly; WebM/Ogg (what the browser recorder produces)
+    and anything else go through ffmpeg when it is installed.
+    """
+    if not os.path.exists(path):
+        raise ValueError(f"Recording not found: {path}")
+    try:
+        return _decode_wav(path, sample_rate)
+    except (wave.Error, EOFError):
+        return _decode_ffmpeg(path, sample_rate)
+
+
+# ------------------------
+# Framing and voice activity
+# ------------------------
+def frame_signal(samples, frame_length, hop_length):
+    """(n_frames, frame_length) strided view of ``samples``; no data is copied"""
+    if len(samples) < frame_length:
+        samples = np.pad(samples, (0, frame_length - len(samples)))
+    return np.lib.stride_tricks.sliding_window_view(samples, frame_length)[::hop_length]
+
+
+def _runs(mask):
+    """(starts, ends) frame indices of the True runs in a boolean array"""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def voice_activity(level_db, hop_seconds):
+    """Boolean speech mask per frame from frame levels in dB"""
+    floor = np.percentile(level_db, 10)
+    threshold = max(floor + VAD_MARGIN_DB, level_db.max() - VAD_RANGE_DB, SILENCE_FLOOR_DB)
+    speech = level_db > threshold
+    # Bridge gaps too short to be pauses (stop closures, between syllables)
+    starts, ends = _runs(~speech)
+    short = (ends - starts) * hop_seconds < MIN_PAUSE_SECONDS
+    inner = (starts > 0) & (ends < len(speech))
+    for start, end in zip(starts[short & inner], ends[short & inner]):
+        speech[start:end] = True
+    return speech
+
+
+# ------------------------
+# Pitch
+# ------------------------
+def track_pitch(samples, sample_rate=SAMPLE_RATE, hop_length=None):
+    """F0 contour in Hz per hop (NaN where unvoiced), computed for all frames at once.
+
+    YIN: the difference function of every frame comes from one batched
+    FFT cross-correlation plus cumulative sums of squares, then the
+    cumulative-mean-normalised dips are searched with array operations.
+    """
+    hop_length = hop_length or int(HOP_SECONDS * sample_rate)
+    window = int(YIN_WINDOW_SECONDS * sample_rate)
+    min_lag = int(sample_rate / F0_MAX)
+    max_lag = int(np.ceil(sample_rate / F0_MIN))
+    frames = frame_signal(samples, window + max_lag, hop_length).astype(np.float64)
+
+    # r(tau) = sum_j x[j] * x[j + tau] over the first ``window`` samples;
+    # j + tau never passes the frame end, so an FFT of the frame size cannot wrap
+    size = 1 << int(np.ceil(np.log2(frames.shape[1])))
+    spectrum = np.fft.rfft(frames, size, axis=1)
+    head = np.fft.rfft(frames[:, :window], size, axis=1)
+    corr = np.fft.irfft(np.conj(head) * spectrum, size, axis=1)[:, :max_lag + 1]
+    squares = np.concatenate([np.zeros((len(frames), 1)), np.cumsum(frames ** 2, axis=1)], axis=1)
+    lags = np.arange(max_lag + 1)
+    energy_at_lag = squares[:, lags + window] - squares[:, lags]
+    diff = np.maximum(energy_at_lag[:, :1] + energy_at_lag - 2 * corr, 0)
+
+    # Cumulative mean normalised difference, d'(0) = 1
+    cumulative = np.cumsum(diff[:, 1:], axis=1)
+    cmnd = np.ones_like(diff)
+    cmnd[:, 1:] = diff[:, 1:] * lags[1:] / np.maximum(cumulative, 1e-12)
+
+    search = cmnd[:, min_lag:max_lag]
+    below = search < YIN_THRESHOLD
+    # First lag under the threshold, walked down to the bottom of that dip
+    first = np.where(below.any(axis=1), below.argmax(axis=1), search.argmin(axis=1))
+    rising = np.concatenate([search[:, 1:] > search[:, :-1], np.ones((len(search), 1), bool)], axis=1)
+    rising[np.arange(search.shape[1])[None, :] < first[:, None]] = False
+    best = rising.argmax(axis=1)
+    rows = np.arange(len(search))
+    voiced = search[rows, best] < YIN_VOICED_MAX
+
+    # Parabolic refinement of the lag
+    left = search[rows, np.maximum(best - 1, 0)]
+    centre = search[rows, best]
+    right = search[rows, np.minimum(best + 1, search.shape[1] - 1)]
+    denominator = left - 2 * centre + right
+    offset = np.where(np.abs(denominator) > 1e-12, 0.5 * (left - right) / np.where(denominator == 0, 1, denominator), 0)
+    lag = best + min_lag + np.clip(offset, -0.5, 0.5)
+    return np.where(voiced, sample_rate / lag, np.nan)
+
+
+def pitch_measurements(f0, hop_seconds):
+    """Pitch level, variability, jitter and modulation (vocal tremor) of an F0 contour"""
+    voiced = ~np.isnan(f0)
+    result = {"voiced_ratio": float(voiced.mean()) if len(f0) else 0.0, "f0_median": None,
+              "pitch_std_semitones": 0.0, "pitch_jitter": 0.0,
+              "pitch_modulation_hz": None, "vocal_tremor_power": 0.0}
+    if voiced.sum() < 10:
+        return result
+    median = float(np.median(f0[voiced]))
+    semitones = 12 * np.log2(f0 / median)
+    result["f0_median"] = median
+    result["pitch_std_semitones"] = float(np.nanstd(semitones))
+    # Relative change of the period between consecutive voiced frames
+    pairs = voiced[1:] & voiced[:-1]
+    if pairs.any():
+        result["pitch_jitter"] = float(np.median(np.abs(np.diff(1 / f0))[pairs] * f0[1:][pairs]))
+
+    # Modulation spectrum of the contour, unvoiced gaps filled by interpolation
+    index = np.arange(len(f0))
+    contour = np.interp(index, index[voiced], semitones[voiced])
+    contour = contour[index[voiced][0]:index[voiced][-1] + 1]
+    if len(contour) >= 32:
+        # Remove slow intonation so only fast modulation is left
+        kernel = int(round(0.5 / hop_seconds)) | 1
+        trend = np.convolve(contour, np.ones(kernel) / kernel, mode="same")
+        detail = (contour - trend) * np.hanning(len(contour))
+        power = np.abs(np.fft.rfft(detail)) ** 2
+        freqs = np.fft.rfftfreq(len(detail), d=hop_seconds)
+        valid = (freqs >= PITCH_MODULATION_RANGE[0]) & (freqs <= PITCH_MODULATION_RANGE[1])
+        total = power[valid].sum()
+        if total > 0:
+            band = (freqs >= VOCAL_TREMOR_BAND[0]) & (freqs <= VOCAL_TREMOR_BAND[1])
+            result["pitch_modulation_hz"] = float(freqs[valid][np.argmax(power[valid])])
+            result["vocal_tremor_power"] = float(power[band].sum() / total)
+    return result
+
+
+# ------------------------
+# Spectrogram
+# ------------------------
+def _hz_to_mel(hz):
+    return 2595 * np.log10(1 + np.asarray(hz) / 700)
+
+
+def mel_filterbank(n_bands, n_fft, sample_rate):
+    """(n_bands, n_fft // 2 + 1) triangular mel filters"""
+    edges = 700 * (10 ** (np.linspace(0, _hz_to_mel(sample_rate / 2), n_bands + 2) / 2595) - 1)
+    freqs = np.fft.rfftfreq(n_fft, 1 / sample_rate)
+    lower, centre, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (freqs - lower) / (centre - lower)
+    falling = (upper - freqs) / (upper - centre)
+    return np.maximum(0, np.minimum(rising, falling)).astype(np.float32)
+
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+
+def _load_mel_filterbank(path=None):
+    """MEL_BANDS filters for SAMPLE_RATE: computed, or a calibrated set saved with np.save"""
+    filters = mel_filterbank(MEL_BANDS, N_FFT, SAMPLE_RATE) if path is None else np.load(path).astype(np.float32)
+    if filters.shape != (MEL_BANDS, N_FFT // 2 + 1):
+        raise ValueError(f"Mel filterbank must be {MEL_BANDS} x {N_FFT // 2 + 1}, got {filters.shape}")
+    return _read_only(filters)
+
+
+MODELS.register("mel_filterbank", "audio", _load_mel_filterbank, version=f"mel{MEL_BANDS}-fft{N_FFT}-{SAMPLE_RATE}hz")
+
+
+class Spectrogram:
+    """Decoded samples, frame energy, STFT power, mel and energy bands of one recording.
+
+    Everything is computed once on construction and exposed as read-only
+    arrays, so all extractors (and every rerun via SPECTRAL_CACHE) share
+    the same buffers instead of each taking its own FFT.
+    """
+
+    def __init__(self, samples, sample_rate=SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.frame_length = int(FRAME_SECONDS * sample_rate)
+        self.hop_length = int(HOP_SECONDS * sample_rate)
+        self.hop_seconds = self.hop_length / sample_rate
+        self.samples = _read_only(np.ascontiguousarray(samples, dtype=np.float32))
+        frames = frame_signal(self.samples, self.frame_length, self.hop_length)
+
+        self.energy = _read_only(np.einsum("ij,ij->i", frames, frames) / self.frame_length)
+        self.level_db = _read_only(10 * np.log10(self.energy + 1e-10))
+        self.freqs = _read_only(np.fft.rfftfreq(N_FFT, 1 / sample_rate).astype(np.float32))
+        window = np.hanning(self.frame_length).astype(np.float32)
+        spectrum = np.fft.rfft(frames * window, N_FFT, axis=1)
+        self.power = _read_only((spectrum.real ** 2 + spectrum.imag ** 2).astype(np.float32))
+        filters = (MODELS.get("mel_filterbank") if sample_rate == SAMPLE_RATE
+                   else mel_filterbank(MEL_BANDS, N_FFT, sample_rate))
+        self.mel = _read_only(self.power @ filters.T)
+        cumulative = np.concatenate([np.zeros((len(self.power), 1), np.float32),
+                                     np.cumsum(self.power, axis=1)], axis=1)
+        edges = np.searchsorted(self.freqs, np.array(ENERGY_BANDS, dtype=np.float32))
+        self.bands = _read_only(cumulative[:, edges[:, 1]] - cumulative[:, edges[:, 0]])
+
+    @property
+    def duration(self):
+        return len(self.samples) / self.sample_rate
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.samples, self.energy, self.level_db, self.power, self.mel, self.bands))
+
+
+class SpectralCache:
+    """Small LRU of Spectrogram objects keyed by recording content hash"""
+
+    def __init__(self, size=SPECTRAL_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, sample_rate=SAMPLE_RATE):
+        """Spectrogram of the recording at ``path``, decoded at most once per content"""
+        if not os.path.exists(path):
+            raise ValueError(f"Recording not found: {path}")
+        # The mel bands depend on the filterbank version the registry serves
+        key = (recording_hash(path), sample_rate, MODELS.selected("mel_filterbank"))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        spectrogram = Spectrogram(decode_audio(path, sample_rate), sample_rate)
+        with self._lock:
+            self._entries[key] = spectrogram
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return spectrogram
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+SPECTRAL_CACHE = SpectralCache()
+
+
+def spectral_measurements(spectrogram, speech):
+    """Articulation and voice-quality measures from the shared spectrogram's speech frames"""
+    result = {"spectral_centroid_std": 0.0, "spectral_flatness": 0.0,
+              "high_band_ratio": 0.0, "mel_flux_db": 0.0}
+    if speech.sum() < 2:
+        return result
+    power = spectrogram.power[speech]
+    freqs = spectrogram.freqs
+    total = power.sum(axis=1) + 1e-12
+    # Consonants pull the centroid up, vowels down; slurred speech blurs the contrast
+    result["spectral_centroid_std"] = float((power @ freqs / total).std())
+    # Breathy or hoarse voice fills the harmonic gaps below 4 kHz with noise
+    voice = power[:, (freqs > 0) & (freqs <= 4000)] + 1e-12
+    flatness = np.exp(np.log(voice).mean(axis=1)) / voice.mean(axis=1)
+    result["spectral_flatness"] = float(np.median(flatness))
+    bands = spectrogram.bands[speech]
+    result["high_band_ratio"] = float(np.median(bands[:, -1] / (bands.sum(axis=1) + 1e-12)))
+    # Frame-to-frame movement of the mel envelope (formant transitions)
+    log_mel = 10 * np.log10(spectrogram.mel[speech] + 1e-10)
+    adjacent = np.diff(np.flatnonzero(speech)) == 1
+    flux = np.abs(np.diff(log_mel, axis=0)).mean(axis=1)[adjacent]
+    result["mel_flux_db"] = float(flux.mean()) if len(flux) else 0.0
+    return result
+
+
+def syllable_peaks(level_db, speech, hop_seconds):
+    """Frame indices of syllable nuclei: local maxima of the smoothed level inside speech"""
+    kernel = np.hanning(7)
+    smooth = np.convolve(level_db, kernel / kernel.sum(), mode="same")
+    peaks = np.flatnonzero((smooth[1:-1] > smooth[:-2]) & (smooth[1:-1] >= smooth[2:]) & speech[1:-1]) + 1
+    if len(peaks) < 2:
+        return peaks
+    # Keep the louder of two peaks closer than a syllable
+    min_gap = int(round(MIN_SYLLABLE_GAP_SECONDS / hop_seconds))
+    keep = [peaks[0]]
+    for peak in peaks[1:]:
+        if peak - keep[-1] >= min_gap:
+            keep.append(peak)
+        elif smooth[peak] > smooth[keep[-1]]:
+            keep[-1] = peak
+    return np.array(keep)
+
+
+def extract_audio_measurements(spectrogram):
+    """Voice activity, pauses, speech rate, pitch and spectral measures of a recording's Spectrogram"""
+    samples, sample_rate = spectrogram.samples, spectrogram.sample_rate
+    hop_length, hop_seconds = spectrogram.hop_length, spectrogram.hop_seconds
+    level_db = spectrogram.level_db
+
+    speech = voice_activity(level_db, hop_seconds)
+    duration = spectrogram.duration
+    speech_starts, speech_ends = _runs(speech)
+    pause_starts, pause_ends = _runs(~speech)
+    # Only silences between two stretches of speech are pauses
+    inner = (pause_starts > 0) & (pause_ends < len(speech))
+    pauses = (pause_ends - pause_starts)[inner] * hop_seconds
+    pauses = pauses[pauses >= MIN_PAUSE_SECONDS]
+
+    peaks = syllable_peaks(level_db, speech, hop_seconds)
+    speech_seconds = float(speech.sum() * hop_seconds)
+
+    # Per guided task: share of time spoken and delay before speaking starts
+    task_count = max(1, int(np.ceil(duration / AUDIO_TASK_SECONDS)))
+    task_of_frame = np.minimum((np.arange(len(speech)) * hop_seconds // AUDIO_TASK_SECONDS).astype(int),
+                               task_count - 1)
+    task_speech = np.bincount(task_of_frame, weights=speech, minlength=task_count)
+    task_frames = np.bincount(task_of_frame, minlength=task_count)
+    onset_latency = []
+    for task in range(task_count):
+        onsets = speech_starts[task_of_frame[speech_starts] == task] if len(speech_starts) else speech_starts
+        if len(onsets):
+            onset_latency.append(float(onsets[0] * hop_seconds - task * AUDIO_TASK_SECONDS))
+
+    voiced_levels = level_db[speech]
+    intervals = np.diff(peaks) * hop_seconds
+    f0 = track_pitch(samples, sample_rate, hop_length)[:len(speech)]
+    f0[~speech[:len(f0)]] = np.nan
+    return {
+        **pitch_measurements(f0, hop_seconds),
+        **spectral_measurements(spectrogram, speech),
+        "duration": duration,
+        "speech_seconds": speech_seconds,
+        "speech_ratio": speech_seconds / duration if duration else 0.0,
+        "segments": int(len(speech_starts)),
+        "mean_segment_seconds": float((speech_ends - speech_starts).mean() * hop_seconds) if len(speech_starts) else 0.0,
+        "pause_count": int(len(pauses)),
+        "pauses_per_minute": len(pauses) / (duration / 60) if duration else 0.0,
+        "mean_pause_seconds": float(pauses.mean()) if len(pauses) else 0.0,
+        "long_pauses": int((pauses >= LONG_PAUSE_SECONDS).sum()),
+        "syllables": int(len(peaks)),
+        "speech_rate": len(peaks) / speech_seconds if speech_seconds else 0.0,
+        "syllable_interval_cv": float(intervals.std() / intervals.mean()) if len(intervals) > 1 else 0.0,
+        "level_std_db": float(voiced_levels.std()) if len(voiced_levels) else 0.0,
+        "level_jitter_db": float(np.abs(np.diff(voiced_levels)).mean()) if len(voiced_levels) > 1 else 0.0,
+        "task_speech_ratio": (task_speech / np.maximum(task_frames, 1)).tolist(),
+        "mean_onset_seconds": float(np.mean(onset_latency)) if onset_latency else None,
+    }
+
+
+# ------------------------
+# Scores
+# ------------------------
+def _vocal_tremor_score(band_power):
+    # Share of VOCAL_TREMOR_BAND within PITCH_MODULATION_RANGE that white noise would get
+    noise_share = ((VOCAL_TREMOR_BAND[1] - VOCAL_TREMOR_BAND[0])
+                   / (PITCH_MODULATION_RANGE[1] - PITCH_MODULATION_RANGE[0]))
+    return saturate(max(0.0, band_power - noise_share) / (1 - noise_share), 1.0)
+
+
+def score_audio(m):
+    """Turn extract_audio_measurements() output into the AUDIO_FEATURES risk scores (0..1)"""
+    names = [feature for feature, _ in AUDIO_FEATURES]
+    if m["speech_seconds"] < 1.0:
+        return dict.fromkeys(names, NEUTRAL_SCORE)
+    recall_ratio = m["task_speech_ratio"][RECALL_TASK] if len(m["task_speech_ratio"]) > RECALL_TASK else None
+    scores = {
+        # Conversational speech runs at roughly 3-5 syllables per second
+        names[0]: saturate(abs(m["speech_rate"] - 4.0), 2.5),
+        # Pitch jitter, rhythmic modulation of the pitch (vocal tremor) and a noisy, breathy spectrum
+        names[1]: (saturate(m["pitch_jitter"], 0.04) + _vocal_tremor_score(m["vocal_tremor_power"])
+                   + saturate(max(0.0, m["spectral_flatness"] - 0.05), 0.35)) / 3,
+        # Little consonant/vowel spectral contrast and weak fricative energy read as slurred articulation
+        names[2]: ((1 - saturate(m["spectral_centroid_std"], 1200.0))
+                   + (1 - saturate(m["high_band_ratio"], 0.05))) / 2,
+        names[3]: (saturate(m["pauses_per_minute"], 30.0) + saturate(m["mean_pause_seconds"], 1.5)) / 2,
+        # Flat pitch contour; conversational speech varies by 2-4 semitones
+        names[4]: 1 - saturate(m["pitch_std_semitones"], 3.0),
+        names[5]: saturate(m["long_pauses"], 8),
+        # Acoustic proxy only: short, fragmented phrases
+        names[6]: 1 - saturate(m["mean_segment_seconds"], 2.0),
+        names[7]: NEUTRAL_SCORE if recall_ratio is None else 1 - saturate(recall_ratio, 0.5),
+        names[8]: NEUTRAL_SCORE if m["mean_onset_seconds"] is None else saturate(m["mean_onset_seconds"], 4.0),
+        # Irregular syllable timing and sluggish formant transitions read as dysarthric speech
+        names[9]: (saturate(m["syllable_interval_cv"], 1.0) + 1 - saturate(m["mel_flux_db"], 4.0)) / 2,
+    }
+    return scores
+
+
+def analyze_audio(path, cache=SPECTRAL_CACHE):
+    """Score a recording against AUDIO_FEATURES; returns (scores, measurements)"""
+    spectrogram = cache.get(path) if cache is not None else Spectrogram(decode_audio(path))
+    if not len(spectrogram.samples):
+        raise ValueError(f"No audio could be decoded from {path}")
+    measurements = extract_audio_measurements(spectrogram)
+    return score_audio(measurements), measurements
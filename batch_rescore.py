@@ -0,0 +1,261 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+
+from analysis_cache import AnalysisCache, cache_key, recording_hash
+from audio_engine import AUDIO_FEATURES
+from job_queue import ANALYZERS, MAX_WORKERS, analyzer_versions
+from patient_store import ConflictError, PatientStore, ShardedPatientStore
+from scoring import (AUDIO_CONDITIONS, CONDITIONS, VIDEO_CONDITIONS, audio_probability_matrix,
+                     combine_predictions, combine_probability_matrices, compute_audio_probabilities,
+                     compute_video_probabilities, video_probability_matrix)
+from video_engine import FEATURE_GUIDELINES
+
+# Same defaults as app.py, which cannot be imported outside `streamlit run`
+DB_FILE = "neurohealth.db"
+UPLOAD_BASE = "user_data"
+ANALYSIS_CACHE_DIR = "analysis_cache"
+CHECKPOINT_FILE = "rescore_checkpoint.jsonl"
+
+# multimodal_analysis field holding each kind's recording path (see page_final_results)
+RECORDING_FIELDS = {"video": "video_path", "audio": "audio_file"}
+# Prefixes of the recordings app.py saves under UPLOAD_BASE/<patient_id>/
+RECORDING_PREFIXES = ("video_", "recording_")
+
+
+def open_store(backend, db_file=DB_FILE, upload_base=UPLOAD_BASE):
+    if backend == "sharded":
+        return ShardedPatientStore(upload_base)
+    return PatientStore(db_file)
+
+
+def resolve_recording(path, upload_base=UPLOAD_BASE):
+    """Absolute path of a stored recording path.
+
+    app.py stores paths relative to its working directory, starting with
+    its UPLOAD_BASE; that prefix is replaced by ``upload_base`` so the CLI
+    does not have to run from the app directory.
+    """
+    if os.path.isabs(path):
+        return path
+    parts = os.path.normpath(path).split(os.sep)
+    if parts[0] == os.path.normpath(UPLOAD_BASE):
+        path = os.path.join(upload_base, *parts[1:])
+    return os.path.abspath(path)
+
+
+def find_visits(store, upload_base=UPLOAD_BASE):
+    """(key, patient_key, visit_index, record, analysis, paths) for every analysed visit with recordings"""
+    for patient_key, record in store.load_all().items():
+        for visit_index, visit in enumerate(record.get("visits", [])):
+            analysis = visit.get("multimodal_analysis")
+            if not analysis:
+                continue
+            paths = {kind: resolve_recording(analysis[field], upload_base)
+                     for kind, field in RECORDING_FIELDS.items() if analysis.get(field)}
+            if paths:
+                key = f"{patient_key}/{visit_index}/{analysis.get('assessment_id', '')}"
+                yield key, patient_key, visit_index, record, analysis, paths
+
+
+def unlinked_recordings(upload_base, linked_paths):
+    """Recordings under upload_base that no visit refers to (saved before paths were stored)"""
+    linked = {os.path.abspath(path) for path in linked_paths}
+    count = 0
+    for root, _, files in os.walk(upload_base):
+        for name in files:
+            if name.startswith(RECORDING_PREFIXES) and os.path.abspath(os.path.join(root, name)) not in linked:
+                count += 1
+    return count
+
+
+def load_checkpoint(path, versions):
+    """Visit keys already re-scored with analyser ``versions``"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # Last line torn by an interrupted run
+            if entry.get("versions") == versions:
+                done.add(entry["visit"])
+    return done
+
+
+def analyze_visit(paths, cache_dir=ANALYSIS_CACHE_DIR):
+    """Worker: {kind: (scores, measurements), or an error message} for one visit's recordings"""
+    cache = AnalysisCache(cache_dir)
+    versions = analyzer_versions()
+    results = {}
+    for kind, path in paths.items():
+        try:
+            if not os.path.exists(path):
+                raise ValueError(f"Recording not found: {path}")
+            key = cache_key(kind, versions[kind], recording_hash(path))
+            result = cache.get(key)
+            if result is None:
+                result = ANALYZERS[kind](path)
+                cache.put(key, result)
+            results[kind] = result
+        except Exception as e:  # One unreadable recording fails its visit, not the run
+            results[kind] = str(e) or type(e).__name__
+    return results
+
+
+def rescored_analysis(analysis, results, versions):
+    """A visit's multimodal_analysis with the new scores and the predictions recomputed from them"""
+    updated = dict(analysis)
+    for kind, (scores, measurements) in results.items():
+        updated[f"{kind}_scores"] = scores
+        updated[f"{kind}_measurements"] = measurements
+    updated["video_probs"] = compute_video_probabilities(updated["video_scores"])
+    updated["audio_probs"] = compute_audio_probabilities(updated["audio_scores"])
+    updated["combined_probs"] = combine_predictions(updated["video_probs"], updated["audio_probs"])
+    updated["analyzer_versions"] = {**(analysis.get("analyzer_versions") or {}),
+                                    **{kind: versions[kind] for kind in results}}
+    updated["rescored_date"] = str(date.today())
+    return updated
+
+
+def _probability_dict(row, order):
+    probs = dict(zip(CONDITIONS, row))
+    return {condition: probs[condition] for condition in order}
+
+
+def rescore_probabilities(store):
+    """Recompute every visit's probabilities from its stored feature scores in one vectorised pass.
+
+    For scoring changes that leave the analysers alone: nothing is
+    re-analysed, the whole registry goes through scoring's matrix
+    functions at once and only visits whose numbers changed are written.
+    """
+    video_names = [feature for feature, _ in FEATURE_GUIDELINES]
+    audio_names = [feature for feature, _ in AUDIO_FEATURES]
+    visits, skipped = [], 0
+    for patient_key, record in store.load_all().items():
+        for visit_index, visit in enumerate(record.get("visits", [])):
+            analysis = visit.get("multimodal_analysis")
+            if not analysis:
+                continue
+            video_scores, audio_scores = analysis.get("video_scores") or {}, analysis.get("audio_scores") or {}
+            if set(video_names) <= set(video_scores) and set(audio_names) <= set(audio_scores):
+                visits.append((patient_key, visit_index, record, analysis))
+            else:
+                skipped += 1
+    if not visits:
+        return 0, skipped, 0
+
+    video = video_probability_matrix([[a["video_scores"][f] for f in video_names] for _, _, _, a in visits])
+    audio = audio_probability_matrix([[a["audio_scores"][f] for f in audio_names] for _, _, _, a in visits])
+    combined = combine_probability_matrices(video, audio)
+
+    written = conflicts = 0
+    for (patient_key, visit_index, record, analysis), v, a, c in zip(visits, video.tolist(), audio.tolist(),
+                                                                      combined.tolist()):
+        updated = dict(analysis, video_probs=_probability_dict(v, VIDEO_CONDITIONS),
+                       audio_probs=_probability_dict(a, AUDIO_CONDITIONS),
+                       combined_probs=dict(zip(CONDITIONS, c)))
+        if all(updated[k] == analysis.get(k) for k in ("video_probs", "audio_probs", "combined_probs")):
+            continue
+        updated["rescored_date"] = str(date.today())
+        try:
+            store.set_analysis(patient_key, visit_index, updated, base=record)
+        except (ConflictError, KeyError):
+            conflicts += 1
+            continue
+        written += 1
+    return written, skipped, conflicts
+
+
+def is_current(analysis, paths, versions):
+    stored = analysis.get("analyzer_versions") or {}
+    return all(stored.get(kind) == versions[kind] for kind in paths)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score every stored visit with the current analysers.")
+    parser.add_argument("--store", choices=["sqlite", "sharded"], default=os.environ.get("NEUROHEALTH_STORE", "sqlite"))
+    parser.add_argument("--db", default=DB_FILE, help="SQLite database (sqlite store)")
+    parser.add_argument("--upload-base", default=UPLOAD_BASE, help="Recordings and sharded patient files")
+    parser.add_argument("--cache-dir", default=ANALYSIS_CACHE_DIR)
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--force", action="store_true", help="Also re-score visits already at the current versions")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint of an earlier run")
+    parser.add_argument("--probabilities-only", action="store_true",
+                        help="Only recompute probabilities from the stored feature scores")
+    args = parser.parse_args(argv)
+
+    store = open_store(args.store, args.db, args.upload_base)
+    if args.probabilities_only:
+        start = time.perf_counter()
+        written, skipped, conflicts = rescore_probabilities(store)
+        print(f"Updated the probabilities of {written} visits in {time.perf_counter() - start:.2f} s "
+              f"({skipped} without complete feature scores, {conflicts} changed during the run)")
+        return 1 if conflicts else 0
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    versions = analyzer_versions()
+    done = load_checkpoint(args.checkpoint, versions)
+
+    visits, linked, resumed, current = [], [], 0, 0
+    for visit in find_visits(store, args.upload_base):
+        key, _, _, _, analysis, paths = visit
+        linked.extend(paths.values())
+        if key in done:
+            resumed += 1
+        elif not args.force and is_current(analysis, paths, versions):
+            current += 1
+        else:
+            visits.append(visit)
+    print(f"{len(visits)} visits to re-score "
+          f"({resumed} done by an earlier run, {current} already at analyser versions {versions})")
+    unlinked = unlinked_recordings(args.upload_base, linked)
+    if unlinked:
+        print(f"{unlinked} recordings under {args.upload_base} are not linked to a visit and are skipped")
+
+    written = failed = conflicts = recordings = 0
+    start = time.perf_counter()
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max(1, args.workers), mp_context=context) as pool, open(args.checkpoint, "a") as checkpoint:
+        futures = {pool.submit(analyze_visit, visit[5], args.cache_dir): visit for visit in visits}
+        for future in as_completed(futures):
+            key, patient_key, visit_index, record, analysis, _ = futures[future]
+            try:
+                results = future.result()
+            except Exception as e:  # e.g. the worker process died
+                failed += 1
+                print(f"  {key}: {e}")
+                continue
+            errors = [message for message in results.values() if isinstance(message, str)]
+            recordings += len(results) - len(errors)
+            if errors:
+                failed += 1
+                print(f"  {key}: {'; '.join(errors)}")
+                continue
+            try:
+                store.set_analysis(patient_key, visit_index, rescored_analysis(analysis, results, versions), base=record)
+            except (ConflictError, KeyError):
+                conflicts += 1
+                print(f"  {key}: visit changed during the run, left for the next one")
+                continue
+            checkpoint.write(json.dumps({"visit": key, "versions": versions}) + "\n")
+            checkpoint.flush()
+            written += 1
+
+    elapsed = time.perf_counter() - start
+    rate = recordings / elapsed if elapsed > 0 else 0.0
+    print(f"Re-scored {written} visits ({failed} failed, {conflicts} changed during the run)")
+    print(f"Analysed {recordings} recordings in {elapsed:.1f} s: {rate:.2f} recordings/s with {args.workers} workers")
+    return 1 if failed or conflicts else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,77 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Threads used by FeatureGraph.run() for independent nodes. NumPy and
+# OpenCV release the GIL in their heavy calls, so threads are enough.
+MAX_WORKERS = 4
+
+
+class FeatureGraph:
+    """Small dependency-graph executor for feature extraction.
+
+    Each node is a function plus the names of the values it consumes.
+    ``run()`` computes only the nodes its targets need, each exactly once,
+    and hands back every computed value so intermediates are shared by all
+    downstream features for the duration of one analysis. Nodes whose
+    inputs are ready run in parallel.
+    """
+
+    def __init__(self):
+        self._nodes = {}
+
+    def add(self, name, func, inputs=()):
+        """Register ``func(*inputs)`` as the producer of ``name``"""
+        if name in self._nodes:
+            raise ValueError(f"Node already defined: {name}")
+        self._nodes[name] = (func, tuple(inputs))
+
+    def node(self, name, inputs=()):
+        """Decorator form of add()"""
+        def register(func):
+            self.add(name, func, inputs)
+            return func
+        return register
+
+    def _required(self, targets, values):
+        """Names of the nodes needed for ``targets`` that are not already in ``values``"""
+        needed, visiting = set(), set()
+
+        def visit(name):
+            if name in values or name in needed:
+                return
+            if name not in self._nodes:
+                raise KeyError(f"No node or input named {name!r}")
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through {name!r}")
+            visiting.add(name)
+            for dep in self._nodes[name][1]:
+                visit(dep)
+            visiting.discard(name)
+            needed.add(name)
+
+        for target in targets:
+            visit(target)
+        return needed
+
+    def run(self, targets, values=None, max_workers=MAX_WORKERS):
+        """Compute ``targets`` from the given input ``values``; returns all values computed"""
+        values = dict(values or {})
+        pending = self._required(targets, values)
+        if max_workers <= 1:
+            while pending:
+                name = next(n for n in pending if all(d in values for d in self._nodes[n][1]))
+                func, inputs = self._nodes[name]
+                values[name] = func(*(values[d] for d in inputs))
+                pending.discard(name)
+            return values
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            running = {}
+            while pending or running:
+                for name in [n for n in pending if all(d in values for d in self._nodes[n][1])]:
+                    func, inputs = self._nodes[name]
+                    running[pool.submit(func, *(values[d] for d in inputs))] = name
+                    pending.discard(name)
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    values[running.pop(future)] = future.result()
+        return values
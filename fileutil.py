@@ -0,0 +1,24 @@
+import json
+import os
+import tempfile
+
+
+def atomic_write_json(path, data, indent=2):
+    """Write JSON to a temp file in the same directory, then rename over path.
+
+    Readers see either the old file or the complete new one, never a
+    partial write.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
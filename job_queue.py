@@ -0,0 +1,155 @@
+import multiprocessing
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import audio_engine
+import video_engine
+from model_registry import MODELS
+
+# Analysers a job can run, by kind; each takes a recording path
+ANALYZERS = {
+    "video": video_engine.analyze_video,
+    "audio": audio_engine.analyze_audio,
+}
+# Bump an engine's ANALYZER_VERSION whenever a change would alter the scores
+# of an existing recording; cached results (analysis_cache) of older versions
+# are then ignored
+ANALYZER_VERSIONS = {
+    "video": video_engine.ANALYZER_VERSION,
+    "audio": audio_engine.ANALYZER_VERSION,
+}
+
+# Analyses running at once across all sessions; the rest wait in the queue
+MAX_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+# Finished jobs no session has collected (e.g. the tab was closed) are dropped after this long
+FINISHED_JOB_TTL = 600
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+def analyzer_versions():
+    """{kind: version}: the engine's ANALYZER_VERSION plus the versions of the models it serves.
+
+    Used in every analysis cache key and stored with each analysis, so a
+    hot-swapped model invalidates earlier results like an engine change.
+    """
+    versions = {}
+    for kind, engine_version in ANALYZER_VERSIONS.items():
+        models = "+".join(f"{name}-{version}" for name, version in sorted(MODELS.versions(kind).items()))
+        # Versions end up in cache file names
+        versions[kind] = str(engine_version) + ("+" + re.sub(r"[^\w.+-]", "_", models) if models else "")
+    return versions
+
+
+def _warm_models():
+    # Load the models when a worker starts instead of inside its first analysis
+    MODELS.warm()
+
+
+def _run(kind, path):
+    return ANALYZERS[kind](path)
+
+
+class JobQueue:
+    """Local analysis queue backed by a process pool.
+
+    Pages submit a recording and get a job id back straight away, then
+    poll() it on later reruns, so no server thread waits on an analysis.
+    How many analyses run concurrently is set by the pool size, not by
+    the number of open sessions. A worker that dies (e.g. killed for
+    memory) fails the jobs of its pool, and the next job gets a new pool.
+
+    With a ``cache`` (an AnalysisCache), each result is stored under the
+    job's cache key as soon as it finishes, whether or not the session
+    that submitted it is still there to poll.
+    """
+
+    def __init__(self, cache=None, max_workers=MAX_WORKERS):
+        self.cache = cache
+        self.max_workers = max_workers
+        self._pool = None
+        self._jobs = {}  # job_id -> (pool, Future)
+        self._finished = {}  # job_id -> time.monotonic() when it finished
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        # Spawned workers do not inherit the server's threads or open database handles
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_warm_models)
+        return self._pool
+
+    def _discard(self, pool):
+        # Called with self._lock held; a broken pool accepts no more jobs
+        if self._pool is pool:
+            self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _expire(self):
+        # Called with self._lock held
+        cutoff = time.monotonic() - FINISHED_JOB_TTL
+        for job_id in [job_id for job_id, finished in self._finished.items() if finished < cutoff]:
+            del self._finished[job_id]
+            self._jobs.pop(job_id, None)
+
+    def _on_done(self, job_id, key, future):
+        try:
+            if key is not None and self.cache is not None and not future.cancelled() and future.exception() is None:
+                self.cache.put(key, future.result())
+        finally:
+            with self._lock:
+                if job_id in self._jobs:
+                    self._finished[job_id] = time.monotonic()
+
+    def submit(self, kind, path, key=None):
+        """Queue ``ANALYZERS[kind](path)``; returns the job id.
+
+        ``key`` is the cache_key() the result is stored under in ``cache``.
+        """
+        if kind not in ANALYZERS:
+            raise ValueError(f"Unknown analysis kind: {kind}")
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._expire()
+            pool = self._executor()
+            try:
+                future = pool.submit(_run, kind, path)
+            except BrokenProcessPool:
+                self._discard(pool)
+                pool = self._executor()
+                future = pool.submit(_run, kind, path)
+            self._jobs[job_id] = (pool, future)
+        future.add_done_callback(lambda future: self._on_done(job_id, key, future))
+        return job_id
+
+    def poll(self, job_id):
+        """(status, value): the analyser's result when DONE, its exception when FAILED"""
+        with self._lock:
+            pool, future = self._jobs.get(job_id, (None, None))
+        if future is None:
+            return FAILED, KeyError(f"Unknown job: {job_id}")
+        if not future.done():
+            return PENDING, None
+        error = future.exception()
+        if isinstance(error, BrokenProcessPool):
+            with self._lock:
+                self._discard(pool)
+            return FAILED, RuntimeError("The analysis worker stopped unexpectedly, please try again")
+        if error is not None:
+            return FAILED, error
+        return DONE, future.result()
+
+    def forget(self, job_id):
+        """Drop a finished job, or cancel it if it has not started yet"""
+        with self._lock:
+            _, future = self._jobs.pop(job_id, (None, None))
+            self._finished.pop(job_id, None)
+        if future is not None:
+            future.cancel()
@@ -0,0 +1,177 @@
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from fileutil import atomic_write_json
+
+# Selected model versions, shared by every process (server and analysis
+# workers). An entry overrides a model's registered default:
+# {"face_cascade": {"version": "...", "source": "/path/to/cascade.xml"}}
+MODELS_FILE = os.environ.get("NEUROHEALTH_MODELS", "models.json")
+# How often get() looks at MODELS_FILE for a hot-swapped version
+CONFIG_CHECK_SECONDS = 2.0
+
+ModelInfo = namedtuple("ModelInfo", "name kind version source load_seconds nbytes")
+_Entry = namedtuple("_Entry", "version source asset error info")
+
+
+def _resident_bytes():
+    """Resident set size of this process, or None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def asset_nbytes(asset):
+    """Bytes held by the NumPy arrays of an asset (also inside dicts, lists, tuples), or None"""
+    if isinstance(asset, np.ndarray):
+        return asset.nbytes
+    if isinstance(asset, dict):
+        asset = list(asset.values())
+    if isinstance(asset, (list, tuple)):
+        sizes = [asset_nbytes(item) for item in asset]
+        return sum(sizes) if sizes and None not in sizes else None
+    return None
+
+
+def _read_config(path):
+    try:
+        with open(path) as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return config if isinstance(config, dict) else {}
+
+
+class ModelRegistry:
+    """Analyser assets (cascades, weight arrays, calibration tables) by name.
+
+    Each model is loaded lazily on first get() and then shared, read-only,
+    by every caller in the process. activate() hot-swaps a model to a new
+    version: it is written to MODELS_FILE, which every process revalidates
+    by file stamp, so the next get() anywhere loads and serves the new
+    version without a restart. Callers still holding the old asset keep
+    using it until they finish.
+    """
+
+    def __init__(self, config_path=MODELS_FILE):
+        self.config_path = config_path
+        self._specs = {}  # name -> (kind, loader, version, source)
+        self._loaded = {}  # name -> _Entry
+        self._load_locks = {}
+        self._lock = threading.Lock()
+        self._config = {}
+        self._config_stamp = None
+        self._config_checked = None
+
+    def register(self, name, kind, loader, version, source=None):
+        """Declare ``loader(source)`` (or ``loader()``) as the default ``version`` of ``name``"""
+        with self._lock:
+            self._specs[name] = (kind, loader, str(version), source)
+            self._load_locks.setdefault(name, threading.Lock())
+
+    def names(self, kind=None):
+        return [name for name, spec in self._specs.items() if kind is None or spec[0] == kind]
+
+    def _overrides(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._config_checked is not None and now - self._config_checked < CONFIG_CHECK_SECONDS:
+                return self._config
+            self._config_checked = now
+            try:
+                stat = os.stat(self.config_path)
+                stamp = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                stamp = None
+            if stamp != self._config_stamp:
+                self._config_stamp = stamp
+                self._config = _read_config(self.config_path) if stamp else {}
+            return self._config
+
+    def selected(self, name):
+        """(version, source) served for ``name``: its MODELS_FILE entry, else the registered default"""
+        _, _, version, source = self._specs[name]
+        override = self._overrides().get(name) or {}
+        return str(override.get("version", version)), override.get("source") or source
+
+    def versions(self, kind=None):
+        """{name: selected version} of every registered model (of ``kind``)"""
+        return {name: self.selected(name)[0] for name in self.names(kind)}
+
+    def _load(self, name, version, source):
+        kind, loader = self._specs[name][:2]
+        before = _resident_bytes()
+        start = time.perf_counter()
+        try:
+            asset, error = (loader(source) if source is not None else loader()), None
+        except (OSError, ValueError) as e:
+            asset, error = None, f"Could not load model {name} {version}: {e}"
+        seconds = time.perf_counter() - start
+        nbytes = asset_nbytes(asset)
+        if nbytes is None and before is not None and asset is not None:
+            # Native objects (e.g. OpenCV classifiers): growth of the process instead
+            nbytes = max(0, (_resident_bytes() or before) - before)
+        return _Entry(version, source, asset, error, ModelInfo(name, kind, version, source, seconds, nbytes))
+
+    def get(self, name):
+        """The asset of ``name`` at its selected version, loading it on first use.
+
+        Raises KeyError for an unregistered name and ValueError when the
+        selected version cannot be loaded (the failure is remembered, not
+        retried, until another version is selected).
+        """
+        version, source = self.selected(name)
+        entry = self._loaded.get(name)
+        if entry is None or (entry.version, entry.source) != (version, source):
+            with self._load_locks[name]:
+                entry = self._loaded.get(name)
+                if entry is None or (entry.version, entry.source) != (version, source):
+                    entry = self._load(name, version, source)
+                    with self._lock:
+                        self._loaded[name] = entry
+        if entry.error:
+            raise ValueError(entry.error)
+        return entry.asset
+
+    def activate(self, name, version, source=None):
+        """Hot-swap ``name`` to ``version`` in every process; refused if it does not load here"""
+        if name not in self._specs:
+            raise KeyError(f"No model named {name!r}")
+        version = str(version)
+        source = source or self._specs[name][3]
+        entry = self._load(name, version, source)
+        if entry.error:
+            raise ValueError(entry.error)
+
+        config = _read_config(self.config_path)
+        config[name] = {"version": version, "source": source}
+        atomic_write_json(self.config_path, config)
+        with self._lock:
+            self._loaded[name] = entry
+            self._config_checked = None  # Re-read MODELS_FILE on the next get()
+        return entry.info
+
+    def report(self):
+        """ModelInfo of every model loaded in this process, with its load time and memory footprint"""
+        with self._lock:
+            return [entry.info for entry in self._loaded.values()]
+
+    def warm(self, kind=None):
+        """Load every model (of ``kind``) now rather than on first use; returns report()"""
+        for name in self.names(kind):
+            try:
+                self.get(name)
+            except ValueError:
+                pass  # Reported through report(); callers degrade without the model
+        return self.report()
+
+
+# The registry of this process; the engines register their models on import
+MODELS = ModelRegistry()
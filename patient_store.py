@@ -0,0 +1,1102 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import types
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from fileutil import atomic_write_json
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+# ------------------------
+# Schema
+# ------------------------
+# Patient and visit fields that get their own column. Anything else a page
+# stores on a record (e.g. "gender") is kept in the JSON "extra" column.
+PATIENT_COLUMNS = ("patient_id", "name", "age", "blood_group", "phone", "assigned_doctor", "created_date")
+VISIT_COLUMNS = ("date", "reason", "hospital", "doctor", "status")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    patient_key TEXT PRIMARY KEY,
+    patient_id TEXT UNIQUE,
+    name TEXT,
+    age INTEGER,
+    blood_group TEXT,
+    phone TEXT,
+    assigned_doctor TEXT,
+    created_date TEXT,
+    extra TEXT NOT NULL DEFAULT '{}',
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_patients_doctor ON patients(assigned_doctor);
+
+-- Word-prefix search over name, phone and patient_id for the doctor
+-- dashboard, kept in sync with patients by the triggers below
+CREATE VIRTUAL TABLE IF NOT EXISTS patient_search USING fts5(
+    name, phone, patient_id, content='patients', content_rowid='rowid', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS patient_search_insert AFTER INSERT ON patients BEGIN
+    INSERT INTO patient_search (rowid, name, phone, patient_id)
+    VALUES (new.rowid, new.name, new.phone, new.patient_id);
+END;
+CREATE TRIGGER IF NOT EXISTS patient_search_delete AFTER DELETE ON patients BEGIN
+    INSERT INTO patient_search (patient_search, rowid, name, phone, patient_id)
+    VALUES ('delete', old.rowid, old.name, old.phone, old.patient_id);
+END;
+CREATE TRIGGER IF NOT EXISTS patient_search_update AFTER UPDATE OF name, phone, patient_id ON patients BEGIN
+    INSERT INTO patient_search (patient_search, rowid, name, phone, patient_id)
+    VALUES ('delete', old.rowid, old.name, old.phone, old.patient_id);
+    INSERT INTO patient_search (rowid, name, phone, patient_id)
+    VALUES (new.rowid, new.name, new.phone, new.patient_id);
+END;
+
+CREATE TABLE IF NOT EXISTS visits (
+    visit_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    patient_key TEXT NOT NULL REFERENCES patients(patient_key) ON DELETE CASCADE,
+    date TEXT,
+    reason TEXT,
+    hospital TEXT,
+    doctor TEXT,
+    status TEXT,
+    extra TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_visits_patient ON visits(patient_key, visit_id);
+
+CREATE TABLE IF NOT EXISTS assessments (
+    visit_id INTEGER PRIMARY KEY REFERENCES visits(visit_id) ON DELETE CASCADE,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS analyses (
+    visit_id INTEGER PRIMARY KEY REFERENCES visits(visit_id) ON DELETE CASCADE,
+    data TEXT NOT NULL
+);
+
+-- Per-doctor dashboard counters, maintained by every write
+CREATE TABLE IF NOT EXISTS doctor_stats (
+    doctor TEXT PRIMARY KEY,
+    patients INTEGER NOT NULL DEFAULT 0,
+    patients_with_visits INTEGER NOT NULL DEFAULT 0,
+    visits INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Patient IDs keep the 6-digit format of the original random generator
+PATIENT_ID_MIN = 100000
+PATIENT_ID_MAX = 999999
+
+# Patient records kept by read_patient(), shared by all sessions of a process
+READ_CACHE_SIZE = 256
+# Idle SQLite connections kept open for reuse; busier moments open extra ones
+CONNECTION_POOL_SIZE = 8
+
+
+def _search_terms(query):
+    """Lower-case words of a dashboard search query"""
+    return re.findall(r"[^\W_]+", (query or "").lower())
+
+
+def _split_fields(record, columns, skip=()):
+    """Split a record dict into column values and leftover JSON fields"""
+    values = {col: record.get(col) for col in columns}
+    extra = {k: v for k, v in record.items() if k not in columns and k not in skip}
+    return values, json.dumps(extra)
+
+
+class ConflictError(Exception):
+    """A write raced with another session that changed the same fields"""
+
+    def __init__(self, patient_key, fields):
+        self.patient_key = patient_key
+        self.fields = list(fields)
+        super().__init__(f"Patient record was changed by another session ({', '.join(self.fields)})")
+
+
+def _field_conflicts(base, current, fields):
+    """Fields that someone else changed since base, to a value other than ours"""
+    return [f for f, value in fields.items() if current.get(f) != base.get(f) and current.get(f) != value]
+
+
+def patient_conflicts(base, current, fields):
+    """Conflicting profile fields between a stale base record and the current one"""
+    return _field_conflicts(base, current, fields)
+
+
+def visit_conflicts(base, current, visit_index, fields=None):
+    """Conflicts for a write to visit ``visit_index`` (fields=None means delete).
+
+    The visit now at this index must still be the one the caller saw: the
+    same ``visit_id``, or for a base without one, the same values in every
+    field the write leaves alone. A deleted visit must also still hold the
+    values base has for it.
+
+    ``base["visits"]`` is either the full visit list or a
+    {visit_index: visit} dict of just the visits, and fields, the caller
+    rendered; fields missing from such a partial visit never conflict.
+    """
+    base_visits = base.get("visits", [])
+    current_visits = current.get("visits", [])
+    partial = isinstance(base_visits, dict)
+    if partial:
+        base_visit = base_visits.get(visit_index)
+    else:
+        base_visit = base_visits[visit_index] if visit_index < len(base_visits) else None
+    if base_visit is None or visit_index >= len(current_visits):
+        return ["visits"]
+    current_visit = current_visits[visit_index]
+    if "visit_id" in base_visit:
+        if base_visit["visit_id"] != current_visit.get("visit_id"):
+            return ["visits"]
+        checked = set(base_visit) if fields is None else set()
+    else:
+        checked = (set(base_visit) if partial else set(base_visit) | set(current_visit)) - set(fields or ())
+    if any(base_visit.get(k) != current_visit.get(k) for k in checked):
+        return ["visits"]
+    if partial:
+        fields = {f: value for f, value in (fields or {}).items() if f in base_visit}
+    return _field_conflicts(base_visit, current_visit, fields or {})
+
+
+def _read_legacy_json(json_path):
+    with open(json_path, "r") as f:
+        return json.load(f)
+
+
+def _row_to_dict(row, columns):
+    record = {col: row[col] for col in columns if row[col] is not None}
+    record.update(json.loads(row["extra"] or "{}"))
+    return record
+
+
+def _patient_from_row(row):
+    record = _row_to_dict(row, PATIENT_COLUMNS)
+    record["version"] = row["version"]
+    return record
+
+
+class PatientStore:
+    """SQLite-backed patient registry (patients, visits, assessments, analyses).
+
+    Visits are addressed by their position in the patient's visit list, the
+    same way the pages index ``user["visits"]``; each visit also carries a
+    ``visit_id`` that is never reused, so a stale base can tell whether the
+    visit at an index is still the one it saw. An in-memory
+    patient_id -> patient_key index is built when the store is opened and
+    kept in sync by every write method. Patients are also indexed by
+    assigned doctor, with per-doctor counters in ``doctor_stats``.
+
+    Each patient record also carries its own ``version``. Write methods
+    accept ``base`` (the record the caller edited); if the patient changed
+    since then, non-overlapping changes are merged and overlapping ones
+    raise ConflictError.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._pool = []
+        self._pool_lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        self._pid_index = {}
+        self._key_index = {}
+        self._read_cache_lock = threading.Lock()
+        self._read_cache = OrderedDict()  # patient_key -> (version, record)
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+        self._upgrade_schema()
+        self.rebuild_index()
+        self.rebuild_doctor_stats()
+        self.rebuild_search_index()
+
+    # ------------------------
+    # Connection handling
+    # ------------------------
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        # Streamlit runs every rerun on a fresh thread, so per-thread
+        # connections would never be reused. Borrow one from a small pool
+        # instead; a connection is only ever used by one thread at a time.
+        with self._pool_lock:
+            conn = self._pool.pop() if self._pool else None
+        if conn is None:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            with self._pool_lock:
+                if len(self._pool) < CONNECTION_POOL_SIZE:
+                    self._pool.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            else:
+                conn.execute("COMMIT")
+
+    def _upgrade_schema(self):
+        """Add columns introduced after a database was first created"""
+        with self._connection() as conn:
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(patients)")}
+            if "version" not in columns:
+                conn.execute("ALTER TABLE patients ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+    # ------------------------
+    # patient_id index
+    # ------------------------
+    def rebuild_index(self):
+        """Rebuild the patient_id -> patient_key index from the database"""
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT patient_id, patient_key FROM patients WHERE patient_id IS NOT NULL"
+            ).fetchall()
+        with self._index_lock:
+            self._pid_index = {row["patient_id"]: row["patient_key"] for row in rows}
+            self._key_index = {row["patient_key"]: row["patient_id"] for row in rows}
+        return len(rows)
+
+    def _index_set(self, patient_id, patient_key):
+        if not patient_id:
+            return
+        with self._index_lock:
+            old_id = self._key_index.get(patient_key)
+            if old_id is not None and old_id != patient_id:
+                self._pid_index.pop(old_id, None)
+            self._pid_index[patient_id] = patient_key
+            self._key_index[patient_key] = patient_id
+
+    def _index_drop_key(self, patient_key):
+        with self._index_lock:
+            patient_id = self._key_index.pop(patient_key, None)
+            if patient_id is not None:
+                self._pid_index.pop(patient_id, None)
+
+    def key_for_patient_id(self, patient_id):
+        """Return the storage key of a patient_id in O(1), or None"""
+        if not patient_id:
+            return None
+        with self._index_lock:
+            patient_key = self._pid_index.get(patient_id)
+        if patient_key is None:
+            # Another process (e.g. a second server) may have registered
+            # the patient after this index was built.
+            with self._connection() as conn:
+                row = conn.execute(
+                    "SELECT patient_key FROM patients WHERE patient_id = ?", (patient_id,)
+                ).fetchone()
+            if row is not None:
+                patient_key = row["patient_key"]
+                self._index_set(patient_id, patient_key)
+        return patient_key
+
+    # ------------------------
+    # Doctor index and counters
+    # ------------------------
+    def rebuild_doctor_stats(self):
+        """Recompute doctor_stats from scratch (run once at startup)"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM doctor_stats")
+            conn.execute(
+                """
+                INSERT INTO doctor_stats (doctor, patients, patients_with_visits, visits)
+                SELECT p.assigned_doctor, COUNT(*), SUM(COALESCE(v.n, 0) > 0), SUM(COALESCE(v.n, 0))
+                FROM patients p
+                LEFT JOIN (SELECT patient_key, COUNT(*) AS n FROM visits GROUP BY patient_key) v
+                    ON v.patient_key = p.patient_key
+                WHERE p.assigned_doctor IS NOT NULL
+                GROUP BY p.assigned_doctor
+                """
+            )
+
+    def _bump_doctor(self, conn, doctor, patients=0, patients_with_visits=0, visits=0):
+        if doctor is None:
+            return
+        conn.execute(
+            """
+            INSERT INTO doctor_stats (doctor, patients, patients_with_visits, visits) VALUES (?, ?, ?, ?)
+            ON CONFLICT(doctor) DO UPDATE SET
+                patients = patients + excluded.patients,
+                patients_with_visits = patients_with_visits + excluded.patients_with_visits,
+                visits = visits + excluded.visits
+            """,
+            (doctor, patients, patients_with_visits, visits),
+        )
+
+    def _patient_doctor_and_visits(self, conn, patient_key):
+        row = conn.execute(
+            """
+            SELECT assigned_doctor, (SELECT COUNT(*) FROM visits WHERE patient_key = ?) AS n
+            FROM patients WHERE patient_key = ?
+            """,
+            (patient_key, patient_key),
+        ).fetchone()
+        if row is None:
+            raise KeyError(patient_key)
+        return row["assigned_doctor"], row["n"]
+
+    def doctor_stats(self, doctor):
+        """Return the dashboard counters for one doctor"""
+        with self._connection() as conn:
+            return self._doctor_stats(conn, doctor)
+
+    def _doctor_stats(self, conn, doctor):
+        row = conn.execute(
+            "SELECT patients, patients_with_visits, visits FROM doctor_stats WHERE doctor = ?", (doctor,)
+        ).fetchone()
+        if row is None:
+            return {"patients": 0, "patients_with_visits": 0, "visits": 0}
+        return dict(row)
+
+    def rebuild_search_index(self):
+        """Re-populate the patient_search index from the patients table"""
+        with self._transaction() as conn:
+            conn.execute("INSERT INTO patient_search (patient_search) VALUES ('rebuild')")
+
+    def search_patients(self, doctor, query="", offset=0, limit=None):
+        """Return (total, [(patient_key, summary), ...]) for one page of a doctor's patients.
+
+        Each word of ``query`` must prefix a word of the patient's name,
+        phone or patient_id; matching goes through the patient_search index
+        and an empty query pages through the doctor index. Summaries carry
+        the profile fields plus ``visit_count``, not the visits themselves.
+        """
+        terms = _search_terms(query)
+        with self._connection() as conn:
+            if terms:
+                # CROSS JOIN keeps the full-text match as the outer loop
+                source = ("patient_search s CROSS JOIN patients p ON p.rowid = s.rowid "
+                          "WHERE patient_search MATCH ? AND p.assigned_doctor = ?")
+                params = (" ".join(f'"{term}"*' for term in terms), doctor)
+                total = conn.execute(f"SELECT COUNT(*) FROM {source}", params).fetchone()[0]
+            else:
+                source = "patients p WHERE p.assigned_doctor = ?"
+                params = (doctor,)
+                total = self._doctor_stats(conn, doctor)["patients"]
+            rows = conn.execute(
+                f"""
+                SELECT p.*, (SELECT COUNT(*) FROM visits v WHERE v.patient_key = p.patient_key) AS visit_count
+                FROM {source}
+                ORDER BY p.rowid
+                LIMIT ? OFFSET ?
+                """,
+                params + (-1 if limit is None else limit, offset),
+            ).fetchall()
+        patients = []
+        for row in rows:
+            summary = _patient_from_row(row)
+            summary["visit_count"] = row["visit_count"]
+            patients.append((row["patient_key"], summary))
+        return total, patients
+
+    def patients_for_doctor(self, doctor):
+        """Return [(patient_key, summary), ...] for all of one doctor's patients"""
+        return self.search_patients(doctor)[1]
+
+    # ------------------------
+    # Reads
+    # ------------------------
+    def _load_visits(self, conn, patient_keys):
+        """Return {patient_key: [visit, ...]} for the given patients"""
+        visits = {key: [] for key in patient_keys}
+        if not patient_keys:
+            return visits
+        placeholders = ",".join("?" * len(patient_keys))
+        rows = conn.execute(
+            f"""
+            SELECT v.*, a.data AS assessment, m.data AS analysis
+            FROM visits v
+            LEFT JOIN assessments a ON a.visit_id = v.visit_id
+            LEFT JOIN analyses m ON m.visit_id = v.visit_id
+            WHERE v.patient_key IN ({placeholders})
+            ORDER BY v.patient_key, v.visit_id
+            """,
+            list(patient_keys),
+        )
+        for row in rows:
+            visit = _row_to_dict(row, VISIT_COLUMNS)
+            visit["visit_id"] = row["visit_id"]
+            if row["assessment"] is not None:
+                visit["doctor_assessment"] = json.loads(row["assessment"])
+            if row["analysis"] is not None:
+                visit["multimodal_analysis"] = json.loads(row["analysis"])
+            visits[row["patient_key"]].append(visit)
+        return visits
+
+    def _get_patient(self, conn, patient_key):
+        row = conn.execute("SELECT * FROM patients WHERE patient_key = ?", (patient_key,)).fetchone()
+        if row is None:
+            return None
+        record = _patient_from_row(row)
+        record["visits"] = self._load_visits(conn, [patient_key])[patient_key]
+        return record
+
+    def get_patient(self, patient_key):
+        """Return one full patient record (with visits), or None"""
+        with self._connection() as conn:
+            return self._get_patient(conn, patient_key)
+
+    def read_patient(self, patient_key):
+        """Return a shared, read-only copy of one patient, or None.
+
+        Records are cached per process (LRU) and revalidated against the
+        patient's version with a single primary-key lookup, so repeated
+        reads from many sessions share one object. Do not mutate it.
+        """
+        with self._connection() as conn:
+            row = conn.execute("SELECT version FROM patients WHERE patient_key = ?", (patient_key,)).fetchone()
+            if row is None:
+                return None
+            with self._read_cache_lock:
+                cached = self._read_cache.get(patient_key)
+                if cached is not None and cached[0] == row["version"]:
+                    self._read_cache.move_to_end(patient_key)
+                    return cached[1]
+            record = self._get_patient(conn, patient_key)
+        if record is None:
+            return None
+        record = types.MappingProxyType(record)
+        with self._read_cache_lock:
+            self._read_cache[patient_key] = (record["version"], record)
+            self._read_cache.move_to_end(patient_key)
+            while len(self._read_cache) > READ_CACHE_SIZE:
+                self._read_cache.popitem(last=False)
+        return record
+
+    def load_all(self):
+        """Return every patient as {patient_key: record}, like the old users.json"""
+        with self._connection() as conn:
+            rows = conn.execute("SELECT * FROM patients ORDER BY rowid").fetchall()
+            visits = {}
+            keys = [row["patient_key"] for row in rows]
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                visits.update(self._load_visits(conn, keys[start:start + 500]))
+        users = {}
+        for row in rows:
+            record = _patient_from_row(row)
+            record["visits"] = visits[row["patient_key"]]
+            users[row["patient_key"]] = record
+        return users
+
+    def keys_without_patient_id(self):
+        with self._connection() as conn:
+            rows = conn.execute("SELECT patient_key FROM patients WHERE patient_id IS NULL").fetchall()
+        return [row["patient_key"] for row in rows]
+
+    # ------------------------
+    # Writes
+    # ------------------------
+    def _insert_patient(self, conn, patient_key, record):
+        values, extra = _split_fields(record, PATIENT_COLUMNS, skip=("visits", "version"))
+        conn.execute(
+            f"INSERT INTO patients (patient_key, {', '.join(PATIENT_COLUMNS)}, extra, version) "
+            f"VALUES (?, {', '.join('?' * len(PATIENT_COLUMNS))}, ?, ?)",
+            [patient_key] + [values[col] for col in PATIENT_COLUMNS] + [extra, record.get("version", 0)],
+        )
+        visits = record.get("visits", [])
+        for visit in visits:
+            self._insert_visit(conn, patient_key, visit)
+        self._bump_doctor(conn, values["assigned_doctor"], patients=1,
+                          patients_with_visits=1 if visits else 0, visits=len(visits))
+
+    def _insert_visit(self, conn, patient_key, visit):
+        values, extra = _split_fields(visit, VISIT_COLUMNS,
+                                      skip=("visit_id", "doctor_assessment", "multimodal_analysis"))
+        cur = conn.execute(
+            f"INSERT INTO visits (patient_key, {', '.join(VISIT_COLUMNS)}, extra) "
+            f"VALUES (?, {', '.join('?' * len(VISIT_COLUMNS))}, ?)",
+            [patient_key] + [values[col] for col in VISIT_COLUMNS] + [extra],
+        )
+        visit_id = cur.lastrowid
+        if visit.get("doctor_assessment") is not None:
+            conn.execute("INSERT INTO assessments (visit_id, data) VALUES (?, ?)",
+                         (visit_id, json.dumps(visit["doctor_assessment"])))
+        if visit.get("multimodal_analysis") is not None:
+            conn.execute("INSERT INTO analyses (visit_id, data) VALUES (?, ?)",
+                         (visit_id, json.dumps(visit["multimodal_analysis"])))
+        return visit_id
+
+    def _visit_id(self, conn, patient_key, visit_index):
+        if visit_index < 0:
+            raise IndexError(f"Visit {visit_index} not found for {patient_key}")
+        row = conn.execute(
+            "SELECT visit_id FROM visits WHERE patient_key = ? ORDER BY visit_id LIMIT 1 OFFSET ?",
+            (patient_key, visit_index),
+        ).fetchone()
+        if row is None:
+            raise IndexError(f"Visit {visit_index} not found for {patient_key}")
+        return row["visit_id"]
+
+    def _update_row(self, conn, table, id_column, id_value, columns, fields):
+        row = conn.execute(f"SELECT extra FROM {table} WHERE {id_column} = ?", (id_value,)).fetchone()
+        if row is None:
+            raise KeyError(id_value)
+        extra = json.loads(row["extra"] or "{}")
+        assignments, params = [], []
+        for field, value in fields.items():
+            if field in columns:
+                assignments.append(f"{field} = ?")
+                params.append(value)
+            else:
+                extra[field] = value
+        assignments.append("extra = ?")
+        params.append(json.dumps(extra))
+        conn.execute(f"UPDATE {table} SET {', '.join(assignments)} WHERE {id_column} = ?", params + [id_value])
+
+    def _check_base(self, conn, patient_key, base, conflicts):
+        """Raise ConflictError if base is stale and conflicts(base, current) finds overlaps"""
+        row = conn.execute("SELECT version FROM patients WHERE patient_key = ?", (patient_key,)).fetchone()
+        if row is None:
+            raise KeyError(patient_key)
+        if base is None or row["version"] == base.get("version", 0):
+            return
+        fields = conflicts(base, self._get_patient(conn, patient_key))
+        if fields:
+            raise ConflictError(patient_key, fields)
+
+    def _touch(self, conn, patient_key):
+        conn.execute("UPDATE patients SET version = version + 1 WHERE patient_key = ?", (patient_key,))
+
+    def allocate_patient_id(self):
+        """Hand out the next free 6-digit patient ID.
+
+        A persisted counter is advanced under the database write lock, so
+        concurrent sessions (or processes) never receive the same ID. IDs
+        already taken by legacy records are skipped, each at most once.
+        """
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'next_patient_id'").fetchone()
+            candidate = int(row["value"]) if row else PATIENT_ID_MIN
+            while candidate <= PATIENT_ID_MAX:
+                patient_id = f"{candidate:06d}"
+                candidate += 1
+                taken = conn.execute("SELECT 1 FROM patients WHERE patient_id = ?", (patient_id,)).fetchone()
+                if not taken:
+                    break
+            else:
+                raise RuntimeError("Patient ID space exhausted")
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('next_patient_id', ?)", (candidate,))
+        return patient_id
+
+    def insert_patient(self, patient_key, record):
+        with self._transaction() as conn:
+            self._insert_patient(conn, patient_key, record)
+        self._index_set(record.get("patient_id"), patient_key)
+
+    def update_patient(self, patient_key, fields, base=None):
+        """Update profile fields of one patient (not visits)"""
+        with self._transaction() as conn:
+            self._check_base(conn, patient_key, base, lambda b, c: patient_conflicts(b, c, fields))
+            if "assigned_doctor" in fields:
+                doctor, n_visits = self._patient_doctor_and_visits(conn, patient_key)
+                if doctor != fields["assigned_doctor"]:
+                    has_visits = 1 if n_visits else 0
+                    self._bump_doctor(conn, doctor, -1, -has_visits, -n_visits)
+                    self._bump_doctor(conn, fields["assigned_doctor"], 1, has_visits, n_visits)
+            self._update_row(conn, "patients", "patient_key", patient_key, PATIENT_COLUMNS, fields)
+            self._touch(conn, patient_key)
+        if "patient_id" in fields:
+            self._index_set(fields["patient_id"], patient_key)
+
+    def delete_patient(self, patient_key):
+        """Delete a patient together with all visits, assessments and analyses"""
+        with self._transaction() as conn:
+            doctor, n_visits = self._patient_doctor_and_visits(conn, patient_key)
+            self._bump_doctor(conn, doctor, -1, -1 if n_visits else 0, -n_visits)
+            conn.execute("DELETE FROM patients WHERE patient_key = ?", (patient_key,))
+        self._index_drop_key(patient_key)
+
+    def add_visit(self, patient_key, visit, base=None):
+        """Append a visit and return its index in the patient's visit list.
+
+        Appends never conflict, so ``base`` is accepted but not checked.
+        """
+        with self._transaction() as conn:
+            doctor, n_visits = self._patient_doctor_and_visits(conn, patient_key)
+            self._insert_visit(conn, patient_key, visit)
+            self._bump_doctor(conn, doctor, patients_with_visits=0 if n_visits else 1, visits=1)
+            self._touch(conn, patient_key)
+            return n_visits
+
+    def update_visit(self, patient_key, visit_index, fields, base=None):
+        with self._transaction() as conn:
+            self._check_base(conn, patient_key, base, lambda b, c: visit_conflicts(b, c, visit_index, fields))
+            visit_id = self._visit_id(conn, patient_key, visit_index)
+            self._update_row(conn, "visits", "visit_id", visit_id, VISIT_COLUMNS, fields)
+            self._touch(conn, patient_key)
+
+    def delete_visit(self, patient_key, visit_index, base=None):
+        with self._transaction() as conn:
+            self._check_base(conn, patient_key, base, lambda b, c: visit_conflicts(b, c, visit_index))
+            visit_id = self._visit_id(conn, patient_key, visit_index)
+            doctor, n_visits = self._patient_doctor_and_visits(conn, patient_key)
+            conn.execute("DELETE FROM visits WHERE visit_id = ?", (visit_id,))
+            self._bump_doctor(conn, doctor, patients_with_visits=-1 if n_visits == 1 else 0, visits=-1)
+            self._touch(conn, patient_key)
+
+    def _set_visit_document(self, table, field, patient_key, visit_index, data, base):
+        with self._transaction() as conn:
+            self._check_base(conn, patient_key, base,
+                             lambda b, c: visit_conflicts(b, c, visit_index, {field: data}))
+            visit_id = self._visit_id(conn, patient_key, visit_index)
+            conn.execute(f"INSERT OR REPLACE INTO {table} (visit_id, data) VALUES (?, ?)",
+                         (visit_id, json.dumps(data)))
+            self._touch(conn, patient_key)
+
+    def set_assessment(self, patient_key, visit_index, data, base=None):
+        self._set_visit_document("assessments", "doctor_assessment", patient_key, visit_index, data, base)
+
+    def set_analysis(self, patient_key, visit_index, data, base=None):
+        self._set_visit_document("analyses", "multimodal_analysis", patient_key, visit_index, data, base)
+
+    # ------------------------
+    # Migration
+    # ------------------------
+    def migrate_from_json(self, json_path):
+        """One-shot import of a legacy users.json file.
+
+        The file is renamed to ``<name>.migrated`` afterwards so the import
+        never runs twice. A file that is not valid JSON raises and is left in
+        place. Returns the number of imported patients.
+        """
+        if not os.path.exists(json_path):
+            return 0
+        users = _read_legacy_json(json_path)
+        imported = 0
+        with self._transaction() as conn:
+            for patient_key, record in users.items():
+                exists = conn.execute("SELECT 1 FROM patients WHERE patient_key = ?", (patient_key,)).fetchone()
+                if not exists:
+                    self._insert_patient(conn, patient_key, record)
+                    imported += 1
+        os.replace(json_path, json_path + ".migrated")
+        self.rebuild_index()
+        return imported
+
+
+# ------------------------
+# Sharded JSON backend
+# ------------------------
+def _number_visits(record):
+    """Give visits without a ``visit_id`` the next ones from the record's counter.
+
+    Legacy visits are numbered by position, the same way on every read,
+    until the first write stores the numbers with the record.
+    """
+    next_id = record.get("next_visit_id", 1)
+    for visit in record.get("visits", []):
+        if "visit_id" not in visit:
+            visit["visit_id"] = next_id
+        next_id = max(next_id, visit["visit_id"] + 1)
+    record["next_visit_id"] = next_id
+    return record
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class ShardedPatientStore:
+    """One JSON document per patient, as an alternative to the SQLite store.
+
+    Layout under ``base_dir`` (normally UPLOAD_BASE)::
+
+        manifest.json               patient_key -> patient_id, assigned_doctor, name, phone
+        next_patient_id             ID allocator counter
+        <patient_id>/patient.json   the patient's record, visits included
+        <patient_id>/...            the patient's recordings
+
+    A visit or assessment write rewrites only that patient's file (temp
+    file + rename) under a per-patient lock, so sessions working on
+    different patients never wait on each other. The manifest is only
+    rewritten when patients are added, removed, renamed or reassigned.
+    Visit counts live in the patient files alone: the per-doctor counters
+    are summed from them when the index is built and then kept in memory
+    by this process's writes. Visit ids come from a ``next_visit_id``
+    counter kept in each patient file.
+    Exposes the same methods (and ``base``/ConflictError semantics) as
+    PatientStore.
+    """
+
+    MANIFEST = "manifest.json"
+    RECORD = "patient.json"
+    COUNTER = "next_patient_id"
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        os.makedirs(base_dir, exist_ok=True)
+        self._lock_guard = threading.Lock()
+        self._thread_locks = {}
+        self._cache_lock = threading.Lock()
+        self._manifest = {}
+        self._manifest_stamp = None
+        self._pid_index = {}
+        self._doctor_index = {}
+        self._doctor_stats = {}
+        self._search_words = {}  # patient_key -> words of name, phone and patient_id
+        self._visit_counts = {}  # patient_key -> number of visits in the patient file
+        self._records = {}  # patient_key -> (file stamp, record)
+        self.rebuild_index()
+
+    # ------------------------
+    # Files and locking
+    # ------------------------
+    def _path(self, *parts):
+        return os.path.join(self.base_dir, *parts)
+
+    def _record_path(self, patient_id):
+        return self._path(str(patient_id), self.RECORD)
+
+    @contextmanager
+    def _locked(self, name):
+        """Exclusive lock on ``<base_dir>/<name>.lock`` across threads and processes"""
+        with self._lock_guard:
+            thread_lock = self._thread_locks.setdefault(name, threading.Lock())
+        lock_path = self._path(name + ".lock")
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        with thread_lock, open(lock_path, "a") as fh:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    # ------------------------
+    # Manifest and indexes
+    # ------------------------
+    def _load_manifest(self):
+        path = self._path(self.MANIFEST)
+        stamp = _file_stamp(path)
+        if stamp is not None and stamp == self._manifest_stamp:
+            return
+        manifest = {}
+        if stamp is not None:
+            with open(path, "r") as f:
+                manifest = json.load(f).get("patients", {})
+        pid_index, doctor_index, search_words = {}, {}, {}
+        for patient_key, entry in manifest.items():
+            pid_index[entry["patient_id"]] = patient_key
+            doctor_index.setdefault(entry.get("assigned_doctor"), []).append(patient_key)
+            search_words[patient_key] = _search_terms(
+                " ".join(str(entry.get(f) or "") for f in ("name", "phone", "patient_id")))
+        # Only patients new to this process have their file read here
+        read_counts = {key: self._count_visits(entry["patient_id"])
+                       for key, entry in manifest.items() if key not in self._visit_counts}
+        with self._cache_lock:
+            visit_counts = {key: self._visit_counts.get(key, read_counts.get(key, 0)) for key in manifest}
+            doctor_stats = {}
+            for patient_key, entry in manifest.items():
+                stats = doctor_stats.setdefault(entry.get("assigned_doctor"),
+                                                {"patients": 0, "patients_with_visits": 0, "visits": 0})
+                stats["patients"] += 1
+                stats["patients_with_visits"] += visit_counts[patient_key] > 0
+                stats["visits"] += visit_counts[patient_key]
+            self._manifest = manifest
+            self._manifest_stamp = stamp
+            self._pid_index = pid_index
+            self._doctor_index = doctor_index
+            self._doctor_stats = doctor_stats
+            self._search_words = search_words
+            self._visit_counts = visit_counts
+
+    def _count_visits(self, patient_id):
+        try:
+            with open(self._record_path(patient_id), "r") as f:
+                return len(json.load(f).get("visits", []))
+        except FileNotFoundError:
+            return 0
+
+    def _set_visit_count(self, patient_key, visit_count):
+        """Keep the in-memory doctor counters in step with a patient's new visit count"""
+        with self._cache_lock:
+            old = self._visit_counts.get(patient_key)
+            entry = self._manifest.get(patient_key)
+            if old is None or entry is None or old == visit_count:
+                return
+            self._visit_counts[patient_key] = visit_count
+            stats = self._doctor_stats[entry.get("assigned_doctor")]
+            stats["patients_with_visits"] += (visit_count > 0) - (old > 0)
+            stats["visits"] += visit_count - old
+
+    def _update_manifest(self, change):
+        """Apply change(manifest) to a fresh copy of the manifest and save it"""
+        with self._locked("manifest"):
+            self._manifest_stamp = None
+            self._load_manifest()
+            manifest = dict(self._manifest)
+            change(manifest)
+            atomic_write_json(self._path(self.MANIFEST), {"patients": manifest})
+            self._manifest_stamp = None
+            self._load_manifest()
+
+    def rebuild_index(self):
+        """Reload the manifest, recount visits from the patient files and rebuild the indexes"""
+        with self._cache_lock:
+            self._visit_counts = {}
+        self._manifest_stamp = None
+        self._load_manifest()
+        stale = [key for key, entry in self._manifest.items() if "name" not in entry]
+        if stale:
+            # Older manifests carry no name/phone for search yet
+            entries = {key: self._manifest_entry(self._read_record(key)) for key in stale}
+            self._update_manifest(lambda manifest: manifest.update(entries))
+        return len(self._manifest)
+
+    def key_for_patient_id(self, patient_id):
+        if not patient_id:
+            return None
+        self._load_manifest()
+        return self._pid_index.get(patient_id)
+
+    def _patient_id(self, patient_key):
+        self._load_manifest()
+        entry = self._manifest.get(patient_key)
+        if entry is None:
+            raise KeyError(patient_key)
+        return entry["patient_id"]
+
+    # ------------------------
+    # Record access
+    # ------------------------
+    def _read_record(self, patient_key):
+        """Return the cached record for a patient, re-reading it if the file changed"""
+        path = self._record_path(self._patient_id(patient_key))
+        stamp = _file_stamp(path)
+        cached = self._records.get(patient_key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        with open(path, "r") as f:
+            record = _number_visits(json.load(f))
+        with self._cache_lock:
+            self._records[patient_key] = (stamp, record)
+        return record
+
+    def _write_record(self, patient_key, record):
+        _number_visits(record)
+        path = self._record_path(record["patient_id"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write_json(path, record)
+        with self._cache_lock:
+            self._records[patient_key] = (_file_stamp(path), record)
+
+    def _modify_record(self, patient_key, change, base=None, conflicts=None):
+        """Read-modify-write one patient file under that patient's lock.
+
+        If ``base`` is stale, conflicts(base, current) decides whether the
+        change can be merged or must raise ConflictError.
+        """
+        patient_id = self._patient_id(patient_key)
+        with self._locked(os.path.join(str(patient_id), "record")):
+            with open(self._record_path(patient_id), "r") as f:
+                record = _number_visits(json.load(f))
+            if base is not None and conflicts is not None and base.get("version", 0) != record.get("version", 0):
+                fields = conflicts(base, record)
+                if fields:
+                    raise ConflictError(patient_key, fields)
+            result = change(record)
+            record["version"] = record.get("version", 0) + 1
+            self._write_record(patient_key, record)
+            # Still under the patient's lock, so concurrent visit writes land in order
+            self._set_visit_count(patient_key, len(record.get("visits", [])))
+        return result
+
+    def get_patient(self, patient_key):
+        try:
+            return json.loads(json.dumps(self._read_record(patient_key)))
+        except (KeyError, FileNotFoundError):
+            return None
+
+    def read_patient(self, patient_key):
+        """Shared read-only record from the per-file cache (see PatientStore.read_patient)"""
+        try:
+            return types.MappingProxyType(self._read_record(patient_key))
+        except (KeyError, FileNotFoundError):
+            return None
+
+    def load_all(self):
+        self._load_manifest()
+        return {key: self._read_record(key) for key in list(self._manifest)}
+
+    def keys_without_patient_id(self):
+        # Every sharded record is stored under its patient_id
+        return []
+
+    # ------------------------
+    # Doctor index and counters
+    # ------------------------
+    def rebuild_doctor_stats(self):
+        self.rebuild_index()
+
+    def _summary(self, patient_key):
+        record = self._read_record(patient_key)
+        summary = {k: v for k, v in record.items() if k != "visits"}
+        summary["visit_count"] = len(record.get("visits", []))
+        return summary
+
+    def search_patients(self, doctor, query="", offset=0, limit=None):
+        """Page of a doctor's patients; words are matched against the manifest, only the page is read"""
+        self._load_manifest()
+        keys = self._doctor_index.get(doctor, [])
+        terms = _search_terms(query)
+        if terms:
+            keys = [key for key in keys
+                    if all(any(word.startswith(term) for word in self._search_words[key]) for term in terms)]
+        page = keys[offset:] if limit is None else keys[offset:offset + limit]
+        return len(keys), [(key, self._summary(key)) for key in page]
+
+    def patients_for_doctor(self, doctor):
+        return self.search_patients(doctor)[1]
+
+    def doctor_stats(self, doctor):
+        """Dashboard counters for one doctor, kept in memory from the patient files' visit counts"""
+        self._load_manifest()
+        return dict(self._doctor_stats.get(doctor, {"patients": 0, "patients_with_visits": 0, "visits": 0}))
+
+    # ------------------------
+    # Writes
+    # ------------------------
+    def allocate_patient_id(self):
+        """Next free 6-digit patient ID from a counter file under an exclusive lock"""
+        with self._locked("allocator"):
+            path = self._path(self.COUNTER)
+            try:
+                with open(path, "r") as f:
+                    candidate = int(f.read().strip() or PATIENT_ID_MIN)
+            except FileNotFoundError:
+                candidate = PATIENT_ID_MIN
+            while candidate <= PATIENT_ID_MAX:
+                patient_id = f"{candidate:06d}"
+                candidate += 1
+                if not os.path.exists(self._record_path(patient_id)):
+                    break
+            else:
+                raise RuntimeError("Patient ID space exhausted")
+            with open(path, "w") as f:
+                f.write(str(candidate))
+        return patient_id
+
+    MANIFEST_FIELDS = ("assigned_doctor", "name", "phone")
+
+    def _manifest_entry(self, record):
+        entry = {field: record.get(field) for field in self.MANIFEST_FIELDS}
+        entry["patient_id"] = record["patient_id"]
+        return entry
+
+    def insert_patient(self, patient_key, record):
+        record = dict(record)
+        record["visits"] = [dict(visit) for visit in record.get("visits", [])]
+        if not record.get("patient_id"):
+            record["patient_id"] = self.allocate_patient_id()
+        self._write_record(patient_key, record)
+        self._update_manifest(lambda manifest: manifest.__setitem__(patient_key, self._manifest_entry(record)))
+
+    def update_patient(self, patient_key, fields, base=None):
+        if "patient_id" in fields and fields["patient_id"] != self._patient_id(patient_key):
+            # The record lives under its patient_id, so move it
+            record = self._read_record(patient_key)
+            record = dict(record, **fields)
+            self.delete_patient(patient_key)
+            self.insert_patient(patient_key, record)
+            return
+        self._load_manifest()
+        entry = self._manifest.get(patient_key, {})
+        self._modify_record(patient_key, lambda record: record.update(fields),
+                            base, lambda b, c: patient_conflicts(b, c, fields))
+        changed = {f: fields[f] for f in self.MANIFEST_FIELDS if f in fields and fields[f] != entry.get(f)}
+        if changed:
+            self._update_manifest(lambda manifest: manifest[patient_key].update(changed))
+
+    def delete_patient(self, patient_key):
+        patient_id = self._patient_id(patient_key)
+        self._update_manifest(lambda manifest: manifest.pop(patient_key, None))
+        try:
+            os.unlink(self._record_path(patient_id))
+        except FileNotFoundError:
+            pass
+        with self._cache_lock:
+            self._records.pop(patient_key, None)
+
+    def add_visit(self, patient_key, visit, base=None):
+        def change(record):
+            record.setdefault("visits", []).append({k: v for k, v in visit.items() if k != "visit_id"})
+            return len(record["visits"]) - 1
+        return self._modify_record(patient_key, change)
+
+    def _modify_visit(self, patient_key, visit_index, change, base, fields):
+        def apply(record):
+            visits = record.get("visits", [])
+            if visit_index < 0 or visit_index >= len(visits):
+                raise IndexError(f"Visit {visit_index} not found for {patient_key}")
+            change(visits, visit_index)
+        self._modify_record(patient_key, apply, base,
+                            lambda b, c: visit_conflicts(b, c, visit_index, fields))
+
+    def update_visit(self, patient_key, visit_index, fields, base=None):
+        self._modify_visit(patient_key, visit_index, lambda visits, i: visits[i].update(fields), base, fields)
+
+    def delete_visit(self, patient_key, visit_index, base=None):
+        self._modify_visit(patient_key, visit_index, lambda visits, i: visits.pop(i), base, None)
+
+    def set_assessment(self, patient_key, visit_index, data, base=None):
+        self._modify_visit(patient_key, visit_index,
+                           lambda visits, i: visits[i].__setitem__("doctor_assessment", data),
+                           base, {"doctor_assessment": data})
+
+    def set_analysis(self, patient_key, visit_index, data, base=None):
+        self._modify_visit(patient_key, visit_index,
+                           lambda visits, i: visits[i].__setitem__("multimodal_analysis", data),
+                           base, {"multimodal_analysis": data})
+
+    def migrate_from_json(self, json_path):
+        """One-shot import of a legacy users.json file into per-patient files"""
+        if not os.path.exists(json_path):
+            return 0
+        users = _read_legacy_json(json_path)
+        self._load_manifest()
+        entries = {}
+        for patient_key, record in users.items():
+            if patient_key in self._manifest:
+                continue
+            record = dict(record, visits=[dict(visit) for visit in record.get("visits", [])])
+            if not record.get("patient_id"):
+                record["patient_id"] = self.allocate_patient_id()
+            self._write_record(patient_key, record)
+            entries[patient_key] = self._manifest_entry(record)
+        self._update_manifest(lambda manifest: manifest.update(entries))
+        os.replace(json_path, json_path + ".migrated")
+        return len(entries)
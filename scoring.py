@@ -0,0 +1,126 @@
+import numpy as np
+
+# ------------------------
+# Feature scores from measurements
+# ------------------------
+def saturate(value, reference):
+    """Map a non-negative measurement onto 0..1, reaching 1 at ``reference``"""
+    return float(np.clip(value / reference, 0.0, 1.0))
+
+
+# ------------------------
+# Disease probabilities from feature scores
+# ------------------------
+# Column order of every probability matrix below
+CONDITIONS = ["Normal", "Parkinson's", "Stroke", "Alzheimer's", "Brain Tumor"]
+# Order the per-patient dicts list their conditions in (pie chart legends)
+VIDEO_CONDITIONS = ["Normal", "Parkinson's", "Stroke", "Alzheimer's", "Brain Tumor"]
+AUDIO_CONDITIONS = ["Normal", "Parkinson's", "Alzheimer's", "Stroke", "Brain Tumor"]
+
+# Share of the non-normal probability per condition, in CONDITIONS[1:] order
+VIDEO_SHARES = np.array([0.35, 0.25, 0.25, 0.15])
+AUDIO_SHARES = np.array([0.30, 0.25, 0.30, 0.15])
+
+VIDEO_WEIGHT = 0.6
+AUDIO_WEIGHT = 0.4
+
+
+# The per-patient functions these replace rounded with round(), which
+# rounds np.float64 the NumPy way (scale by 100, ties to even) and Python
+# floats exactly. A row was np.float64 unless its normal probability sat
+# on the floor, where only Python constants were involved; the video and
+# audio matrices track that per row internally so ties still land the
+# same way. Combining always rounds the NumPy way: the old code only
+# rounded exactly when both inputs sat on their floors, and for that one
+# pair of rows both rules agree.
+def _round2_exact(values):
+    """Round to 2 decimals as Python's round() does for a float.
+
+    Scaling by 100 first turns 0.025 (really 0.02500000000000000139) into
+    the tie 2.5. Recovering the rounding error of the scaling (Dekker's
+    exact product) settles such ties the way the true decimal value says.
+    """
+    values = np.asarray(values, dtype=float)
+    scaled = values * 100
+    high = values * 134217729.0  # 2**27 + 1: splits values into two 26-bit halves
+    high = high - (high - values)
+    low = values - high
+    error = (high * 100 - scaled) + low * 100
+    floor = np.floor(scaled)
+    tie = scaled - floor == 0.5
+    rounded = np.where(tie & (error > 0), floor + 1, np.where(tie & (error < 0), floor, np.rint(scaled)))
+    return rounded / 100
+
+
+def _round2(values, numpy=None):
+    """round(value, 2): NumPy's rule where ``numpy`` is set (everywhere if None), Python's elsewhere"""
+    if numpy is None:
+        return np.round(values, 2)
+    return np.where(numpy, np.round(values, 2), _round2_exact(values))
+
+
+def _normalize(probs, numpy_rows=None, order=None):
+    """Rescale each row to sum to 1, rounded to 2 decimals; all-zero rows are left alone.
+
+    The total is added up column by column in ``order`` (column indices),
+    like sum() over the per-patient dict, so it matches to the last bit.
+    """
+    order = range(probs.shape[1]) if order is None else order
+    total = sum(probs[:, column] for column in order)[:, None]
+    numpy = None if numpy_rows is None else numpy_rows[:, None]
+    return np.where(total > 0, _round2(probs / np.where(total > 0, total, 1), numpy), probs)
+
+
+def _condition_probabilities(scores, slope, normal_floor, shares, order):
+    risk_score = np.atleast_2d(np.asarray(scores, dtype=float)).mean(axis=1)
+    # Lower risk score = higher normal probability, never below normal_floor
+    normal_prob = 1 - risk_score * slope
+    numpy_rows = normal_prob > normal_floor
+    normal_prob = np.where(numpy_rows, normal_prob, normal_floor)
+    # Distribute remaining probability among conditions, at least 0.1
+    remaining_prob = 1 - normal_prob
+    above_minimum = remaining_prob > 0.1
+    remaining_prob = np.where(above_minimum, remaining_prob, 0.1)
+    numpy_remaining = numpy_rows & above_minimum
+    probs = np.column_stack([_round2(normal_prob, numpy_rows),
+                             _round2(remaining_prob[:, None] * shares, numpy_remaining[:, None])])
+    return _normalize(probs, numpy_rows, [CONDITIONS.index(condition) for condition in order])
+
+
+def video_probability_matrix(scores):
+    """(N patients x features) video scores -> (N x CONDITIONS) probabilities"""
+    # Adjust for more realistic screening - most people should be normal (minimum 30%)
+    return _condition_probabilities(scores, 1.2, 0.3, VIDEO_SHARES, VIDEO_CONDITIONS)
+
+
+def audio_probability_matrix(scores):
+    """(N patients x features) audio scores -> (N x CONDITIONS) probabilities"""
+    # Similar adjustment for audio - favor normal cases (minimum 35%)
+    return _condition_probabilities(scores, 1.1, 0.35, AUDIO_SHARES, AUDIO_CONDITIONS)
+
+
+def combine_probability_matrices(video_probs, audio_probs):
+    """Weighted fusion of two probability matrices with the same column order"""
+    combined = _round2(np.asarray(video_probs, dtype=float) * VIDEO_WEIGHT
+                       + np.asarray(audio_probs, dtype=float) * AUDIO_WEIGHT)
+    return _normalize(combined)
+
+
+# ------------------------
+# Per-patient wrappers
+# ------------------------
+def compute_video_probabilities(avg_scores):
+    probs = dict(zip(CONDITIONS, video_probability_matrix([list(avg_scores.values())])[0].tolist()))
+    return {condition: probs[condition] for condition in VIDEO_CONDITIONS}
+
+
+def compute_audio_probabilities(avg_scores):
+    probs = dict(zip(CONDITIONS, audio_probability_matrix([list(avg_scores.values())])[0].tolist()))
+    return {condition: probs[condition] for condition in AUDIO_CONDITIONS}
+
+
+def combine_predictions(video_probs, audio_probs):
+    all_conditions = list(dict.fromkeys([*video_probs, *audio_probs]))
+    video = [[video_probs.get(condition, 0) for condition in all_conditions]]
+    audio = [[audio_probs.get(condition, 0) for condition in all_conditions]]
+    return dict(zip(all_conditions, combine_probability_matrices(video, audio)[0].tolist()))
@@ -0,0 +1,106 @@
+import pytest
+
+from patient_store import ConflictError, PatientStore, ShardedPatientStore
+
+
+@pytest.fixture(params=["sqlite", "sharded"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        store = PatientStore(str(tmp_path / "patients.db"))
+    else:
+        store = ShardedPatientStore(str(tmp_path / "user_data"))
+    store.insert_patient("p@example.com", {"name": "Asha", "phone": "9876543210", "assigned_doctor": "Dr. Devi"})
+    store.add_visit("p@example.com", {"reason": "headache", "hospital": "City"})
+    return store
+
+
+# ------------------------
+# Profile edits
+# ------------------------
+def test_disjoint_profile_fields_merge(store):
+    base = store.get_patient("p@example.com")
+    store.update_patient("p@example.com", {"phone": "9000000000"}, base=base)
+    store.update_patient("p@example.com", {"name": "Asha R"}, base=base)
+    patient = store.get_patient("p@example.com")
+    assert (patient["name"], patient["phone"]) == ("Asha R", "9000000000")
+
+
+def test_same_profile_field_conflicts(store):
+    base = store.get_patient("p@example.com")
+    store.update_patient("p@example.com", {"name": "Asha R"}, base=base)
+    with pytest.raises(ConflictError) as e:
+        store.update_patient("p@example.com", {"name": "Asha K"}, base=base)
+    assert e.value.fields == ["name"]
+    assert store.get_patient("p@example.com")["name"] == "Asha R"
+
+
+# ------------------------
+# Visit edits
+# ------------------------
+def test_disjoint_visit_fields_merge(store):
+    base = store.get_patient("p@example.com")
+    store.update_visit("p@example.com", 0, {"reason": "migraine"}, base=base)
+    store.set_assessment("p@example.com", 0, {"diagnosis": "Normal"}, base=base)
+    visit = store.get_patient("p@example.com")["visits"][0]
+    assert visit["reason"] == "migraine"
+    assert visit["doctor_assessment"] == {"diagnosis": "Normal"}
+
+
+def test_same_visit_field_conflicts(store):
+    base = store.get_patient("p@example.com")
+    store.update_visit("p@example.com", 0, {"hospital": "General"}, base=base)
+    with pytest.raises(ConflictError):
+        store.update_visit("p@example.com", 0, {"hospital": "Metro"}, base=base)
+    assert store.get_patient("p@example.com")["visits"][0]["hospital"] == "General"
+
+
+def test_visit_added_since_base_merges(store):
+    base = store.get_patient("p@example.com")
+    store.add_visit("p@example.com", {"reason": "follow-up"})
+    store.set_assessment("p@example.com", 0, {"diagnosis": "Normal"}, base=base)
+    visits = store.get_patient("p@example.com")["visits"]
+    assert visits[0]["doctor_assessment"] == {"diagnosis": "Normal"}
+    assert "doctor_assessment" not in visits[1]
+
+
+def test_replaced_visit_at_same_index_conflicts(store):
+    # Delete visit 0 and add another: the count is unchanged but index 0 is a different visit
+    base = store.get_patient("p@example.com")
+    store.delete_visit("p@example.com", 0, base=store.get_patient("p@example.com"))
+    store.add_visit("p@example.com", {"reason": "headache", "hospital": "City"})
+    with pytest.raises(ConflictError):
+        store.set_assessment("p@example.com", 0, {"diagnosis": "Normal"}, base=base)
+    with pytest.raises(ConflictError):
+        store.delete_visit("p@example.com", 0, base=base)
+    visits = store.get_patient("p@example.com")["visits"]
+    assert len(visits) == 1 and "doctor_assessment" not in visits[0]
+
+
+def test_deleting_a_visit_edited_since_base_conflicts(store):
+    base = store.get_patient("p@example.com")
+    store.update_visit("p@example.com", 0, {"hospital": "General"}, base=base)
+    with pytest.raises(ConflictError):
+        store.delete_visit("p@example.com", 0, base=base)
+    assert len(store.get_patient("p@example.com")["visits"]) == 1
+
+
+def test_visit_ids_are_not_reused(store):
+    first = store.get_patient("p@example.com")["visits"][0]["visit_id"]
+    store.delete_visit("p@example.com", 0)
+    store.add_visit("p@example.com", {"reason": "headache", "hospital": "City"})
+    assert store.get_patient("p@example.com")["visits"][0]["visit_id"] != first
+
+
+def test_partial_base_checks_only_the_rendered_visit_fields(store):
+    visit = store.get_patient("p@example.com")["visits"][0]
+    base = {"version": store.get_patient("p@example.com")["version"],
+            "visits": {0: {"visit_id": visit["visit_id"], "reason": "headache"}}}
+    store.set_analysis("p@example.com", 0, {"combined_probs": {}})
+    store.update_visit("p@example.com", 0, {"hospital": "General"}, base=base)
+    with pytest.raises(ConflictError):
+        store.update_visit("p@example.com", 0, {"reason": "migraine"},
+                           base=dict(base, visits={0: dict(base["visits"][0], reason="fever")}))
+    with pytest.raises(ConflictError):
+        store.set_assessment("p@example.com", 1, {"diagnosis": "Normal"}, base=base)
+    visit = store.get_patient("p@example.com")["visits"][0]
+    assert visit["hospital"] == "General" and visit["multimodal_analysis"] == {"combined_probs": {}}
@@ -0,0 +1,111 @@
+import json
+
+import numpy as np
+
+from scoring import (audio_probability_matrix, combine_predictions, combine_probability_matrices,
+                     compute_audio_probabilities, compute_video_probabilities, video_probability_matrix)
+
+
+# ------------------------
+# The per-patient functions scoring.py replaced, as they were
+# ------------------------
+def old_video_probabilities(avg_scores):
+    risk_score = np.mean(list(avg_scores.values()))
+    normal_prob = max(0.3, 1 - risk_score * 1.2)
+    remaining_prob = max(0.1, 1 - normal_prob)
+    probs = {
+        "Normal": round(normal_prob, 2),
+        "Parkinson's": round(remaining_prob * 0.35, 2),
+        "Stroke": round(remaining_prob * 0.25, 2),
+        "Alzheimer's": round(remaining_prob * 0.25, 2),
+        "Brain Tumor": round(remaining_prob * 0.15, 2)
+    }
+    total = sum(probs.values())
+    if total > 0:
+        probs = {k: round(v/total, 2) for k, v in probs.items()}
+    return probs
+
+
+def old_audio_probabilities(avg_scores):
+    risk_score = np.mean(list(avg_scores.values()))
+    normal_prob = max(0.35, 1 - risk_score * 1.1)
+    remaining_prob = max(0.1, 1 - normal_prob)
+    probs = {
+        "Normal": round(normal_prob, 2),
+        "Parkinson's": round(remaining_prob * 0.30, 2),
+        "Alzheimer's": round(remaining_prob * 0.30, 2),
+        "Stroke": round(remaining_prob * 0.25, 2),
+        "Brain Tumor": round(remaining_prob * 0.15, 2)
+    }
+    total = sum(probs.values())
+    if total > 0:
+        probs = {k: round(v/total, 2) for k, v in probs.items()}
+    return probs
+
+
+def old_combine_predictions(video_probs, audio_probs):
+    combined = {}
+    all_conditions = set(list(video_probs.keys()) + list(audio_probs.keys()))
+    for condition in all_conditions:
+        video_score = video_probs.get(condition, 0)
+        audio_score = audio_probs.get(condition, 0)
+        combined[condition] = round(video_score * 0.6 + audio_score * 0.4, 2)
+    total = sum(combined.values())
+    if total > 0:
+        combined = {k: round(v/total, 2) for k, v in combined.items()}
+    return combined
+
+
+def score_dicts(count, features, seed):
+    """Random score dicts, plus constant ones covering the floors and the 0.5 neutral case"""
+    rng = np.random.default_rng(seed)
+    rows = [rng.random(features) for _ in range(count)]
+    rows += [np.round(rng.random(features), 2) for _ in range(count)]
+    rows += [np.full(features, level) for level in np.arange(0, 1.0001, 0.005)]
+    return [{f"f{i}": float(value) for i, value in enumerate(row)} for row in rows]
+
+
+VIDEO_SCORES = score_dicts(2000, 6, 1)
+AUDIO_SCORES = score_dicts(2000, 5, 2)
+
+
+def test_neutral_scores():
+    audio = compute_audio_probabilities({f"f{i}": 0.5 for i in range(5)})
+    assert audio["Parkinson's"] == audio["Alzheimer's"] == 0.16
+    assert audio == old_audio_probabilities({f"f{i}": 0.5 for i in range(5)})
+    assert compute_video_probabilities({f"f{i}": 0.5 for i in range(6)}) == \
+        old_video_probabilities({f"f{i}": 0.5 for i in range(6)})
+
+
+def test_per_patient_functions_match_old():
+    for scores in VIDEO_SCORES:
+        assert compute_video_probabilities(scores) == old_video_probabilities(scores), scores
+    for scores in AUDIO_SCORES:
+        assert compute_audio_probabilities(scores) == old_audio_probabilities(scores), scores
+
+
+def test_combine_predictions_matches_old():
+    for video_scores, audio_scores in zip(VIDEO_SCORES, AUDIO_SCORES):
+        video, audio = compute_video_probabilities(video_scores), compute_audio_probabilities(audio_scores)
+        old_video, old_audio = old_video_probabilities(video_scores), old_audio_probabilities(audio_scores)
+        assert video == old_video and audio == old_audio
+        combined = combine_predictions(video, audio)
+        assert combined == old_combine_predictions(old_video, old_audio)
+        # Plain Python floats, so stored probabilities come back from JSON unchanged
+        assert all(type(value) is float for probs in (video, audio, combined) for value in probs.values())
+        assert json.loads(json.dumps([video, audio, combined])) == [video, audio, combined]
+
+
+def test_matrices_match_old_per_row_results():
+    video = video_probability_matrix([list(scores.values()) for scores in VIDEO_SCORES])
+    audio = audio_probability_matrix([list(scores.values()) for scores in AUDIO_SCORES])
+    combined = combine_probability_matrices(video, audio)
+    conditions = ["Normal", "Parkinson's", "Stroke", "Alzheimer's", "Brain Tumor"]
+    assert all(isinstance(matrix, np.ndarray) and matrix.shape == (len(VIDEO_SCORES), len(conditions))
+               for matrix in (video, audio, combined))
+    for v, a, c, video_scores, audio_scores in zip(video.tolist(), audio.tolist(), combined.tolist(),
+                                                   VIDEO_SCORES, AUDIO_SCORES):
+        old_video, old_audio = old_video_probabilities(video_scores), old_audio_probabilities(audio_scores)
+        assert dict(zip(conditions, v)) == old_video
+        assert dict(zip(conditions, a)) == old_audio
+        assert dict(zip(conditions, c)) == old_combine_predictions(old_video, old_audio)
@@ -0,0 +1,556 @@
+import os
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from feature_graph import FeatureGraph
+from model_registry import MODELS
+from scoring import saturate
+
+# ------------------------
+# Recording protocol
+# ------------------------
+# Six tasks, 10 seconds each (see page_video_recording). Feature names are
+# also the keys of the score dict returned by analyze_video().
+FEATURE_GUIDELINES = [
+    ("Facial expressions & blink rate", "Keep your face visible. Blink normally and show a few natural expressions."),
+    ("Resting tremor & postural tremor", "Keep your hands relaxed on your lap. Observe for tremors while resting."),
+    ("Finger tapping (bradykinesia)", "Tap your index finger and thumb together repeatedly for 5 seconds."),
+    ("Arm swing & gait", "Stand and walk a few steps, letting your arms swing naturally."),
+    ("Postural stability", "Stand still, then turn around carefully. Try not to lose balance."),
+    ("Facial symmetry & head tremor", "Smile naturally, relax your face, and keep head still."),
+]
+TASK_SECONDS = 10
+
+# ------------------------
+# Engine settings
+# ------------------------
+BATCH_SIZE = 32  # Sampled frames per vectorized batch
+WORK_WIDTH = 320  # Full frames are treated as this wide; regions are cropped at that scale
+DEFAULT_FPS = 30.0  # Used when the container does not report a frame rate
+
+# Score used for a feature the clip gives no evidence for (e.g. motion in a single photo)
+NEUTRAL_SCORE = 0.5
+
+ANALYZER_VERSION = 1  # See job_queue.ANALYZER_VERSIONS
+
+# Parkinsonian rest tremor sits at 4-6 Hz. Spectra ignore everything below
+# MIN_TREMOR_HZ (drift, voluntary movement); TREMOR_SAMPLE_FPS keeps the
+# band under the Nyquist limit.
+TREMOR_BAND = (4.0, 6.0)
+MIN_TREMOR_HZ = 1.0
+TREMOR_SAMPLE_FPS = 15
+# Shift (in work-scale pixels per frame) at which tremor amplitude counts fully
+TREMOR_FULL_SHIFT = 0.5
+
+# Recording-quality gate (check_recording_quality)
+QUALITY_SAMPLE_FRAMES = 8  # Frames spread over the clip
+QUALITY_WIDTH = 160  # Sampled frames are checked at this width
+MIN_SHARPNESS = 20.0  # Variance of the Laplacian below this means blurred
+MIN_BRIGHTNESS = 40.0
+MAX_BRIGHTNESS = 220.0
+FACE_CASCADE = "haarcascade_frontalface_default.xml"
+
+# Face tracking for the facial tasks (FaceTracker)
+FACE_SIZE = 96  # Tracked face crops are resized to FACE_SIZE x FACE_SIZE
+TRACK_MIN_CONFIDENCE = 0.6  # Template match score below which the face is re-detected
+TRACK_SEARCH_MARGIN = 0.25  # Search window around the last box, as a fraction of its width
+DETECT_RETRY_FRAMES = 10  # After a failed detection, frames to wait before detecting again
+
+
+def _profile_shift(profiles):
+    """Signed shift between consecutive 1-D intensity profiles (one Lucas-Kanade step per pair)"""
+    grad = np.gradient(profiles, axis=1)
+    grad = (grad[1:] + grad[:-1]) / 2
+    change = np.diff(profiles, axis=0)
+    return -(change * grad).sum(axis=1) / ((grad ** 2).sum(axis=1) + 1e-6)
+
+
+class RegionSeries:
+    """Per-frame measurements of one task's region, accumulated batch by batch.
+
+    Only a few floats per sampled frame are kept, never the frames. With
+    ``flow=True`` the horizontal and vertical shift of the region between
+    sampled frames is tracked as well: the movement inside the region,
+    from its column and row profiles, plus the movement of the region
+    itself when it follows a tracked face.
+    """
+
+    def __init__(self, asymmetry=False, flow=False):
+        self._prev = None
+        self._prev_placement = None
+        self._track_asymmetry = asymmetry
+        self._track_flow = flow
+        self._times = []
+        self._motion = []
+        self._asymmetry = []
+        self._flow = []
+        self.frames = 0
+
+    def add(self, times, batch, placements):
+        """Add a batch; ``placements`` is (B, 3): region x, y and scale in work-scale pixels"""
+        self.frames += len(batch)
+        self._times.append(times)
+        if self._track_asymmetry:
+            half = batch.shape[2] // 2
+            left = batch[:, :, :half].mean(axis=(1, 2))
+            right = batch[:, :, batch.shape[2] - half:].mean(axis=(1, 2))
+            self._asymmetry.append(np.abs(left - right) / (left + right + 1e-6))
+
+        # Motion energy: mean absolute difference to the previous sampled frame
+        if self._prev is not None and self._prev.shape == batch.shape[1:]:
+            batch_with_prev = np.concatenate([self._prev[None], batch])
+            placements_with_prev = np.concatenate([self._prev_placement[None], placements])
+        else:
+            batch_with_prev, placements_with_prev = batch, placements
+        if len(batch_with_prev) > 1:
+            self._motion.append(np.abs(np.diff(batch_with_prev, axis=0)).mean(axis=(1, 2)))
+            if self._track_flow:
+                inside = np.stack([_profile_shift(batch_with_prev.mean(axis=1)),
+                                   _profile_shift(batch_with_prev.mean(axis=2))], axis=1)
+                scale = placements_with_prev[1:, 2:3]
+                self._flow.append(inside * scale + np.diff(placements_with_prev[:, :2], axis=0))
+        self._prev = batch[-1]
+        self._prev_placement = placements[-1]
+
+    @property
+    def sample_rate(self):
+        """Sampled frames per second, from the frame timestamps"""
+        times = np.concatenate(self._times) if self._times else np.empty(0)
+        if len(times) < 2:
+            return 0.0
+        return float(1.0 / np.median(np.diff(times)))
+
+    @property
+    def flow(self):
+        """(N, 2) array of per-frame (x, y) shifts"""
+        return np.concatenate(self._flow) if self._flow else np.empty((0, 2))
+
+    @property
+    def motion(self):
+        return np.concatenate(self._motion) if self._motion else np.empty(0)
+
+    @property
+    def asymmetry(self):
+        return np.concatenate(self._asymmetry) if self._asymmetry else np.empty(0)
+
+
+# ------------------------
+# Per-task extractors
+# ------------------------
+# Each extractor declares the per-task intermediates it consumes (see
+# TASK_INTERMEDIATES) and returns a risk score in 0..1 for its own task
+# window. They are only used when the window has two or more sampled frames.
+def consumes(*inputs):
+    """Declare which per-task intermediates an extractor takes, in argument order"""
+    def mark(func):
+        func.inputs = inputs
+        return func
+    return mark
+
+
+def tremor_spectrum(flow, sample_rate, band=TREMOR_BAND):
+    """Return (dominant frequency in Hz, share of power in ``band``) of an (N, 2) shift signal.
+
+    Power is summed over the x and y components; frequencies below
+    MIN_TREMOR_HZ are left out of both the peak search and the total.
+    """
+    if len(flow) < 8 or sample_rate <= 0:
+        return None, 0.0
+    signal = (flow - flow.mean(axis=0)) * np.hanning(len(flow))[:, None]
+    power = (np.abs(np.fft.rfft(signal, axis=0)) ** 2).sum(axis=1)
+    freqs = np.fft.rfftfreq(len(flow), d=1.0 / sample_rate)
+    valid = freqs >= MIN_TREMOR_HZ
+    total = power[valid].sum()
+    if not valid.any() or total <= 0:
+        return None, 0.0
+    dominant = float(freqs[valid][np.argmax(power[valid])])
+    in_band = (freqs >= band[0]) & (freqs <= band[1])
+    return dominant, float(power[in_band].sum() / total)
+
+
+def tremor_measurements(flow, sample_rate):
+    """Dominant frequency, 4-6 Hz band power share and RMS shift of a region's movement"""
+    dominant, band_power = tremor_spectrum(flow, sample_rate)
+    rms = float(np.sqrt((flow ** 2).sum(axis=1).mean())) if len(flow) else 0.0
+    if dominant is None:
+        return {"dominant_hz": None, "band_power": 0.0, "rms_shift": rms, "score": 0.0}
+    # Share of the band that white noise would get, so noise alone scores 0
+    nyquist = sample_rate / 2
+    noise_share = (min(TREMOR_BAND[1], nyquist) - TREMOR_BAND[0]) / max(nyquist - MIN_TREMOR_HZ, 1e-6)
+    excess = max(0.0, band_power - noise_share) / max(1 - noise_share, 1e-6)
+    return {
+        "dominant_hz": dominant,
+        "band_power": band_power,
+        "rms_shift": rms,
+        "score": saturate(excess, 1.0) * saturate(rms, TREMOR_FULL_SHIFT),
+    }
+
+
+@consumes("motion")
+def facial_expression_score(motion):
+    # Little facial motion reads as reduced expression (hypomimia)
+    return 1 - saturate(motion.mean(), 4.0)
+
+
+@consumes("tremor")
+def tremor_score(tremor):
+    # Rhythmic 4-6 Hz movement of the resting hands
+    return tremor["score"]
+
+
+@consumes("motion")
+def finger_tapping_score(motion):
+    # Little hand motion reads as slowed tapping
+    return 1 - saturate(motion.mean(), 6.0)
+
+
+@consumes("motion")
+def arm_swing_score(motion):
+    # Little body motion reads as reduced arm swing and gait
+    return 1 - saturate(motion.mean(), 8.0)
+
+
+@consumes("motion")
+def postural_stability_score(motion):
+    # Irregular body motion while standing and turning reads as unsteadiness
+    return saturate(motion.std() / (motion.mean() + 1e-6), 1.5)
+
+
+@consumes("asymmetry", "tremor")
+def facial_symmetry_score(asymmetry, tremor):
+    # Left/right imbalance of the face plus rhythmic 4-6 Hz head movement
+    return (saturate(asymmetry.mean(), 0.3) + tremor["score"]) / 2
+
+
+# One entry per FEATURE_GUIDELINES task, in recording order. ``roi`` is
+# (top, bottom, left, right) as fractions of the frame; only those pixels
+# are converted and analysed. ``sample_fps`` is what the task needs: fast
+# facial and hand movements are sampled more densely than gait.
+# ``tremor`` tasks track region shifts and report tremor_measurements().
+# ``face`` tasks use the FaceTracker box as their region, falling back to
+# ``roi`` while no face is found.
+VideoTask = namedtuple("VideoTask", "feature roi sample_fps extractor asymmetry tremor face")
+VIDEO_TASKS = [
+    VideoTask(FEATURE_GUIDELINES[0][0], (0.0, 0.5, 0.25, 0.75), 10, facial_expression_score, False, False, True),
+    VideoTask(FEATURE_GUIDELINES[1][0], (0.5, 1.0, 0.15, 0.85), TREMOR_SAMPLE_FPS, tremor_score, False, True, False),
+    VideoTask(FEATURE_GUIDELINES[2][0], (0.3, 0.9, 0.2, 0.8), 10, finger_tapping_score, False, False, False),
+    VideoTask(FEATURE_GUIDELINES[3][0], (0.0, 1.0, 0.0, 1.0), 5, arm_swing_score, False, False, False),
+    VideoTask(FEATURE_GUIDELINES[4][0], (0.0, 1.0, 0.0, 1.0), 5, postural_stability_score, False, False, False),
+    VideoTask(FEATURE_GUIDELINES[5][0], (0.0, 0.5, 0.25, 0.75), TREMOR_SAMPLE_FPS, facial_symmetry_score,
+              True, True, True),
+]
+
+
+def task_for_time(timestamp, tasks=VIDEO_TASKS):
+    """Index of the task being recorded at ``timestamp`` (same rule as page_video_recording)"""
+    return min(int(timestamp // TASK_SECONDS), len(tasks) - 1)
+
+
+def _crop(frame, roi):
+    height, width = frame.shape[:2]
+    top, bottom, left, right = roi
+    return frame[int(height * top):int(height * bottom), int(width * left):int(width * right)]
+
+
+def iter_task_frames(path, tasks=VIDEO_TASKS, work_width=WORK_WIDTH, tracker=None):
+    """Yield (task index, timestamp, grayscale region, placement) for every sampled frame.
+
+    Frames are decoded one at a time in a single pass. The task window a
+    frame falls in decides whether it is sampled and which region is
+    kept; frames between samples are only grabbed, and only the region
+    is converted and scaled. Facial tasks take their region from
+    ``tracker`` (a FaceTracker, created if not given) as a FACE_SIZE
+    crop. ``placement`` is the region's (x, y, scale) in work-scale
+    pixels, where scale converts region pixels back to work-scale ones.
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {path}")
+    if tracker is None and any(task.face for task in tasks):
+        tracker = FaceTracker()
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+        steps = [max(1, int(round(fps / task.sample_fps))) for task in tasks]
+        index = 0
+        while cap.grab():
+            timestamp = index / fps
+            task_index = task_for_time(timestamp, tasks)
+            task = tasks[task_index]
+            if index % steps[task_index] == 0:
+                ok, frame = cap.retrieve()
+                if not ok:
+                    break
+                scale = min(1.0, work_width / frame.shape[1])
+                face = None
+                if task.face:
+                    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+                    if scale < 1.0:
+                        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                    face = tracker.update(gray)
+                if face is not None:
+                    x, y, w, h = face
+                    region = cv2.getRectSubPix(gray, (int(w), int(h)), (x + w / 2, y + h / 2))
+                    region = cv2.resize(region, (FACE_SIZE, FACE_SIZE), interpolation=cv2.INTER_AREA)
+                    placement = (x, y, w / FACE_SIZE)
+                else:
+                    region = _crop(frame, task.roi)
+                    if region.ndim == 3:
+                        region = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY)
+                    if scale < 1.0:
+                        size = (max(1, int(region.shape[1] * scale)), max(1, int(region.shape[0] * scale)))
+                        region = cv2.resize(region, size, interpolation=cv2.INTER_AREA)
+                    placement = (int(frame.shape[1] * task.roi[2]) * scale,
+                                 int(frame.shape[0] * task.roi[0]) * scale, 1.0)
+                yield task_index, timestamp, region, placement
+            index += 1
+    finally:
+        cap.release()
+
+
+def _load_face_cascade(path):
+    detector = cv2.CascadeClassifier(path)
+    if detector.empty():
+        raise ValueError(f"No cascade could be read from {path}")
+    return detector
+
+
+MODELS.register("face_cascade", "video", _load_face_cascade, version=f"opencv-{cv2.__version__}",
+                source=os.path.join(getattr(getattr(cv2, "data", None), "haarcascades", ""), FACE_CASCADE))
+
+
+def _get_face_detector():
+    """The registry's frontal face cascade, loaded once per process (None if unavailable)"""
+    try:
+        return MODELS.get("face_cascade")
+    except ValueError:
+        return None
+
+
+def _parabola_peak(left, centre, right):
+    """Sub-pixel offset of a peak from three neighbouring scores"""
+    denominator = left - 2 * centre + right
+    return 0.0 if denominator == 0 else float(np.clip(0.5 * (left - right) / denominator, -0.5, 0.5))
+
+
+class FaceTracker:
+    """Face box for a stream of frames: detect once, then follow by template matching.
+
+    The detector only runs on the first frame and whenever the match
+    score of the tracked face drops below ``min_confidence`` (the face
+    turned away, was covered or left the search window). After a failed
+    detection it waits DETECT_RETRY_FRAMES frames before trying again. One
+    tracker is shared by all facial tasks of a recording.
+    """
+
+    def __init__(self, detector=None, min_confidence=TRACK_MIN_CONFIDENCE):
+        self._detector = detector
+        self.min_confidence = min_confidence
+        self.box = None  # (x, y, w, h) in frame pixels, sub-pixel x/y
+        self._template = None
+        self._retry_in = 0
+        self.detections = 0
+        self.tracked = 0
+
+    def _detect(self, gray):
+        detector = self._detector or _get_face_detector()
+        if detector is None:
+            return None
+        self.detections += 1
+        faces = detector.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=4, minSize=(24, 24))
+        if not len(faces):
+            return None
+        x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+        self._template = gray[y:y + h, x:x + w].copy()
+        return float(x), float(y), float(w), float(h)
+
+    def _track(self, gray):
+        x, y, w, h = self.box
+        margin = TRACK_SEARCH_MARGIN * w
+        x0, y0 = max(0, int(x - margin)), max(0, int(y - margin))
+        x1, y1 = min(gray.shape[1], int(x + w + margin) + 1), min(gray.shape[0], int(y + h + margin) + 1)
+        window = gray[y0:y1, x0:x1]
+        th, tw = self._template.shape
+        if window.shape[0] < th or window.shape[1] < tw:
+            return None, 0.0
+        result = cv2.matchTemplate(window, self._template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (mx, my) = cv2.minMaxLoc(result)
+        dx = _parabola_peak(*result[my, mx - 1:mx + 2]) if 0 < mx < result.shape[1] - 1 else 0.0
+        dy = _parabola_peak(*result[my - 1:my + 2, mx]) if 0 < my < result.shape[0] - 1 else 0.0
+        return (x0 + mx + dx, y0 + my + dy, w, h), score
+
+    def update(self, gray):
+        """Return the face box in this frame, or None if no face is found"""
+        if self.box is not None:
+            box, confidence = self._track(gray)
+            if confidence >= self.min_confidence:
+                self.box = box
+                self.tracked += 1
+                return box
+            self.box = None
+        if self._retry_in > 0:
+            self._retry_in -= 1
+            return None
+        self.box = self._detect(gray)
+        if self.box is None:
+            self._retry_in = DETECT_RETRY_FRAMES
+        return self.box
+
+
+def _sample_frames(path, count=QUALITY_SAMPLE_FRAMES, width=QUALITY_WIDTH):
+    """Return up to ``count`` grayscale frames spread evenly over a recording"""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {path}")
+    frames = []
+    try:
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        if total > count:
+            positions = np.linspace(0, total - 1, count).astype(int)
+        else:
+            # Unknown length (e.g. browser WebM) or a still: take the first frames
+            positions = range(count)
+        for position in positions:
+            if total > count:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, int(position))
+            ok, frame = cap.read()
+            if not ok:
+                break
+            if frame.ndim == 3:
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            if frame.shape[1] > width:
+                height = max(1, int(round(frame.shape[0] * width / frame.shape[1])))
+                frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            frames.append(frame)
+    finally:
+        cap.release()
+    return frames
+
+
+def check_recording_quality(path):
+    """Cheap pre-check of a recording on a few sampled frames.
+
+    Returns a report dict: ``ok`` is False when the clip is not worth
+    analysing (unreadable, blurred, too dark or too bright), ``problems``
+    lists those reasons and ``warnings`` lists softer findings such as no
+    face being found.
+    """
+    report = {"ok": False, "problems": [], "warnings": [], "sharpness": None,
+              "brightness": None, "face_found": None, "frames_checked": 0}
+    try:
+        frames = _sample_frames(path)
+    except ValueError:
+        frames = []
+    report["frames_checked"] = len(frames)
+    if not frames:
+        report["problems"].append("The recording could not be read.")
+        return report
+
+    sharpness = float(np.median([cv2.Laplacian(f, cv2.CV_64F).var() for f in frames]))
+    brightness = float(np.mean([f.mean() for f in frames]))
+    report["sharpness"], report["brightness"] = sharpness, brightness
+    if sharpness < MIN_SHARPNESS:
+        report["problems"].append("The recording is blurred. Hold the camera steady and check the focus.")
+    if brightness < MIN_BRIGHTNESS:
+        report["problems"].append("The recording is too dark. Add light in front of the patient.")
+    elif brightness > MAX_BRIGHTNESS:
+        report["problems"].append("The recording is overexposed. Avoid bright light behind or on the camera.")
+
+    detector = _get_face_detector()
+    if detector is not None:
+        report["face_found"] = any(
+            len(detector.detectMultiScale(f, scaleFactor=1.2, minNeighbors=4, minSize=(20, 20)))
+            for f in frames)
+        if not report["face_found"]:
+            report["warnings"].append("No face was found. Facial tasks need the face fully in view.")
+
+    report["ok"] = not report["problems"]
+    return report
+
+
+def iter_batches(frames, batch_size=BATCH_SIZE):
+    """Group iter_task_frames() output into (key, timestamps, (B, H, W) float32 frames, (B, 3) placements)
+    batches of one key and frame shape"""
+    key, times, batch, placements = None, [], [], []
+
+    def flush():
+        return key, np.array(times), np.stack(batch).astype(np.float32), np.array(placements, dtype=np.float64)
+
+    for frame_key, timestamp, frame, placement in frames:
+        if batch and (frame_key != key or frame.shape != batch[0].shape):
+            yield flush()
+            times, batch, placements = [], [], []
+        key = frame_key
+        times.append(timestamp)
+        batch.append(frame)
+        placements.append(placement)
+        if len(batch) == batch_size:
+            yield flush()
+            times, batch, placements = [], [], []
+    if batch:
+        yield flush()
+
+
+def decode_series(path, tasks=VIDEO_TASKS, batch_size=BATCH_SIZE):
+    """The one pass over the frames: a RegionSeries per task, filled batch by batch"""
+    series = [RegionSeries(asymmetry=task.asymmetry, flow=task.tremor) for task in tasks]
+    for task_index, times, batch, placements in iter_batches(iter_task_frames(path, tasks), batch_size):
+        series[task_index].add(times, batch, placements)
+    if not any(s.frames for s in series):
+        raise ValueError(f"No frames could be decoded from {path}")
+    return series
+
+
+# Intermediates derived from each task's RegionSeries, as graph nodes named
+# "task<i>.<name>". Extractors pick theirs with @consumes.
+TASK_INTERMEDIATES = {
+    "motion": (lambda series: series.motion, ("series",)),
+    "asymmetry": (lambda series: series.asymmetry, ("series",)),
+    "flow": (lambda series: series.flow, ("series",)),
+    "sample_rate": (lambda series: series.sample_rate, ("series",)),
+    "tremor": (tremor_measurements, ("flow", "sample_rate")),
+}
+
+
+def _feature_node(extractor):
+    def run(series, *inputs):
+        # Tasks the clip is too short to reach keep the neutral score
+        return extractor(*inputs) if series.frames >= 2 else NEUTRAL_SCORE
+    return run
+
+
+def build_video_graph(tasks=VIDEO_TASKS, batch_size=BATCH_SIZE):
+    """FeatureGraph from a recording ``path`` to ``scores`` and ``measurements``"""
+    graph = FeatureGraph()
+    graph.add("series", lambda path: decode_series(path, tasks, batch_size), ("path",))
+    for i, task in enumerate(tasks):
+        prefix = f"task{i}."
+        graph.add(prefix + "series", lambda series, i=i: series[i], ("series",))
+        for name, (func, inputs) in TASK_INTERMEDIATES.items():
+            graph.add(prefix + name, func, [prefix + dep for dep in inputs])
+        graph.add(task.feature, _feature_node(task.extractor),
+                  [prefix + "series"] + [prefix + name for name in task.extractor.inputs])
+
+    features = [task.feature for task in tasks]
+    graph.add("scores", lambda *values: dict(zip(features, values)), features)
+    tremor_tasks = [i for i, task in enumerate(tasks) if task.tremor]
+    graph.add("measurements",
+              lambda *values: {tasks[i].feature: tremor
+                               for i, series, tremor in zip(tremor_tasks, values[::2], values[1::2])
+                               if series.frames >= 2},
+              [f"task{i}.{name}" for i in tremor_tasks for name in ("series", "tremor")])
+    return graph
+
+
+VIDEO_GRAPH = build_video_graph()
+
+
+def analyze_video(path, graph=VIDEO_GRAPH):
+    """Score a recording against FEATURE_GUIDELINES, one extractor per task window.
+
+    Returns (scores, measurements): the 0..1 risk score per feature, and
+    tremor_measurements() for each tremor task the clip covers.
+    """
+    values = graph.run(["scores", "measurements"], {"path": path})
+    return values["scores"], values["measurements"]